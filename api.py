@@ -1,95 +1,265 @@
 import json
 import logging
 import os
-from datetime import datetime, timedelta
+import threading
+from datetime import date as date_type, datetime, timedelta
 
-import requests
-
-from config import (
-    API_URL, CACHE_FILE, COUNTRY,
-    CALCULATION_METHOD, PRAYER_NAMES, DEFAULT_CITY,
-)
+import clock
+import gazetteer
+import providers
+from config import CACHE_FILE, DEFAULT_CITY
+from resilience import NegativeCache
+from singleflight import SingleFlight
+from storage import atomic_write_json
 
 logger = logging.getLogger(__name__)
 
+_negative_cache = NegativeCache()
+
+# In-memory mirror of CACHE_FILE; written only through _store_many()
+_cache: dict | None = None
+_cache_lock = threading.Lock()
+
+# De-duplicates concurrent fetches of the same cache key
+_flight = SingleFlight()
+
+# Callables(location_key, date_str, times) notified when a background refresh lands
+_refresh_listeners: list = []
+
+
+def add_refresh_listener(fn) -> None:
+    """Register fn(location_key, date_str, times), called after a background refresh.
+
+    location_key is what location_key() returns for the cities concerned.
+    """
+    _refresh_listeners.append(fn)
+
+
+def location_key(city: str) -> str:
+    """Canonical cache key for a city: its JAKIM zone, or the city itself if unknown.
+
+    Every city in a prayer zone has the zone's times, so they share one
+    fetch, one cache entry and one in-flight request.
+    """
+    return gazetteer.zone_for(city) or city
+
+
+def _fetch_location(key: str) -> str:
+    """The location whose times are fetched for a location key."""
+    place = gazetteer.representative(key)
+    return place.name if place else key
+
 
 def _load_cache() -> dict:
     if os.path.exists(CACHE_FILE):
         try:
             with open(CACHE_FILE, "r") as f:
-                return json.load(f)
+                cache = json.load(f)
         except (json.JSONDecodeError, IOError):
             logger.warning("Failed to read cache file")
+            return {}
+        # Entries written before the cache was keyed by zone
+        for old_key in list(cache):
+            city, _, date_str = old_key.rpartition("|")
+            key = location_key(city)
+            if key != city:
+                cache.setdefault(f"{key}|{date_str}", cache.pop(old_key))
+        return cache
     return {}
 
 
-def _save_cache(cache: dict) -> None:
-    try:
-        with open(CACHE_FILE, "w") as f:
-            json.dump(cache, f, indent=2)
-    except IOError:
-        logger.error("Failed to write cache file")
-
-
-def _fetch_from_api(date_str: str, city: str) -> dict | None:
-    """Fetch prayer times from Aladhan API for a given date (DD-MM-YYYY) and city."""
-    try:
-        resp = requests.get(
-            API_URL,
-            params={
-                "city": city,
-                "country": COUNTRY,
-                "method": CALCULATION_METHOD,
-                "date": date_str,
-            },
-            timeout=10,
-        )
-        resp.raise_for_status()
-        data = resp.json()
-        timings = data["data"]["timings"]
-        return {name: timings[name] for name in PRAYER_NAMES}
-    except Exception:
-        logger.exception("API fetch failed for %s / %s", city, date_str)
+def _get_cache() -> dict:
+    """Return the in-memory cache, loading it from disk on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = _load_cache()
+    return _cache
+
+
+def _store_times(cache_key: str, times: dict) -> None:
+    """Add an entry and persist the cache."""
+    _store_many({cache_key: times})
+
+
+def _store_many(entries: dict) -> None:
+    """Add entries and persist the cache with a single write.
+
+    All mutations go through here under one lock, and the file is replaced
+    atomically, so concurrent writers can neither interleave nor drop each
+    other's entries.
+    """
+    cache = _get_cache()
+    with _cache_lock:
+        cache.update(entries)
+        try:
+            atomic_write_json(CACHE_FILE, cache)
+        except OSError:
+            logger.error("Failed to write cache file")
+
+
+def _fetch_and_store(date: datetime, location: str, cache_key: str) -> dict | None:
+    """Fetch one day from the API, shared by all concurrent callers for the key."""
+    return _flight.do(cache_key, _fetch_and_store_once, date, location, cache_key)
+
+
+def _fetch_and_store_once(date: datetime, location: str, cache_key: str) -> dict | None:
+    """Fetch one day from the providers, guarded by the negative cache."""
+    # Another flight may have landed between the caller's miss and now
+    cached = _get_cache().get(cache_key)
+    if cached is not None:
+        return cached
+
+    if _negative_cache.is_blocked(cache_key):
+        logger.debug("Skipping fetch for %s, recently failed", cache_key)
         return None
 
+    times = providers.fetch(date, location)
+    if not times:
+        _negative_cache.record_failure(cache_key)
+        return None
+
+    _negative_cache.clear(cache_key)
+    _store_times(cache_key, times)
+    logger.info("Fetched and cached prayer times for %s", cache_key)
+    return times
+
+
+def _refresh_worker(date: datetime, location: str, cache_key: str) -> None:
+    times = _fetch_and_store(date, location, cache_key)
+    if times:
+        key, _, date_str = cache_key.rpartition("|")
+        for fn in list(_refresh_listeners):
+            try:
+                fn(key, date_str, times)
+            except Exception:
+                logger.exception("Refresh listener failed for %s", cache_key)
+
+
+def _refresh_in_background(date: datetime, location: str, cache_key: str) -> None:
+    if _flight.in_flight(cache_key):
+        return
+    threading.Thread(
+        target=_refresh_worker, args=(date, location, cache_key), daemon=True,
+    ).start()
+
 
 def get_prayer_times(date: datetime | None = None, city: str | None = None) -> dict | None:
     """Get prayer times for the given date and city.
 
     Returns a dict like {"Fajr": "05:42", "Sunrise": "07:01", ...} or None.
-    Uses cache first, falls back to API, then previous day's cache.
-    Cache is keyed by city+date to support switching.
+    Uses cache first and never waits on the network: on a miss the previous
+    day's cache is returned (or None if there is none) while the API is
+    queried in the background, and listeners registered with
+    add_refresh_listener() receive the fresh times. Callers that must have
+    the exact date and can afford to wait use prefetch_prayer_times().
+    Cache is keyed by location_key(city)+date, so cities in one prayer
+    zone share entries.
     """
     if date is None:
-        date = datetime.now()
+        date = clock.now()
     if city is None:
         city = DEFAULT_CITY
 
     date_str = date.strftime("%Y-%m-%d")
-    api_date = date.strftime("%d-%m-%Y")
-    cache_key = f"{city}|{date_str}"
+    key = location_key(city)
+    cache_key = f"{key}|{date_str}"
 
-    cache = _load_cache()
+    cache = _get_cache()
 
     # Check cache
     if cache_key in cache:
-        logger.info("Using cached prayer times for %s", cache_key)
+        logger.debug("Using cached prayer times for %s", cache_key)
         return cache[cache_key]
 
-    # Fetch from API
-    times = _fetch_from_api(api_date, city)
-    if times:
-        cache[cache_key] = times
-        _save_cache(cache)
-        logger.info("Fetched and cached prayer times for %s", cache_key)
-        return times
-
-    # Fallback: try previous day's cache for same city
+    # Stale-while-revalidate: serve previous day's cache for same zone
+    # immediately and fetch the real entry off the caller's thread
     prev_date = (date - timedelta(days=1)).strftime("%Y-%m-%d")
-    prev_key = f"{city}|{prev_date}"
+    prev_key = f"{key}|{prev_date}"
     if prev_key in cache:
         logger.warning("Using previous day's cache as fallback for %s", cache_key)
+        _refresh_in_background(date, _fetch_location(key), cache_key)
         return cache[prev_key]
 
-    logger.error("No prayer times available for %s", cache_key)
+    # Nothing to serve: the listeners get the times when the fetch lands
+    logger.warning("No cached prayer times for %s; fetching in background", cache_key)
+    _refresh_in_background(date, _fetch_location(key), cache_key)
     return None
+
+
+def cached_prayer_times(date: datetime, city: str | None = None) -> dict | None:
+    """Return date's cached times for city without fetching, or None."""
+    key = location_key(city or DEFAULT_CITY)
+    return _get_cache().get(f"{key}|{date.strftime('%Y-%m-%d')}")
+
+
+def prefetch_prayer_times(date: datetime, city: str | None = None) -> dict | None:
+    """Make sure date's times are cached, fetching them now if needed.
+
+    Unlike get_prayer_times() this never falls back to the previous day, so
+    the result is the real timetable for date, or None.
+    """
+    key = location_key(city or DEFAULT_CITY)
+    cache_key = f"{key}|{date.strftime('%Y-%m-%d')}"
+    cached = _get_cache().get(cache_key)
+    if cached is not None:
+        return cached
+    return _fetch_and_store(date, _fetch_location(key), cache_key)
+
+
+def _fetch_range_once(first: date_type, last: date_type, key: str, flight_key: str,
+                      save: bool) -> dict | None:
+    """Bulk-fetch first..last for a location key, guarded by the negative cache."""
+    if _negative_cache.is_blocked(flight_key):
+        logger.debug("Skipping bulk fetch for %s, recently failed", flight_key)
+        return None
+
+    fetched = providers.fetch_range(first, last, _fetch_location(key))
+    if not fetched:
+        _negative_cache.record_failure(flight_key)
+        return None
+
+    _negative_cache.clear(flight_key)
+    if save:
+        _store_many({f"{key}|{date_str}": times for date_str, times in fetched.items()})
+    logger.info("Fetched %d days of prayer times for %s", len(fetched), flight_key)
+    return fetched
+
+
+def get_prayer_times_range(start: date_type, end: date_type, city: str | None = None,
+                           save: bool = False) -> dict[str, dict] | None:
+    """Get {"YYYY-MM-DD": times} for every day from start to end inclusive.
+
+    Cached days are used as they are; the span from the first to the last
+    missing day is fetched with one bulk request per provider call (a month
+    calendar or a JAKIM duration query) instead of a request per day. The
+    fetched days are added to the cache only if save is true, so large
+    exports don't grow the app's cache file. Returns None if the gap could
+    not be filled.
+    """
+    key = location_key(city or DEFAULT_CITY)
+    cache = _get_cache()
+
+    result = {}
+    missing = []
+    day = start
+    while day <= end:
+        date_str = day.isoformat()
+        cached = cache.get(f"{key}|{date_str}")
+        if cached is not None:
+            result[date_str] = cached
+        else:
+            missing.append(day)
+        day += timedelta(days=1)
+
+    if missing:
+        first, last = missing[0], missing[-1]
+        flight_key = f"{key}|{first.isoformat()}..{last.isoformat()}"
+        fetched = _flight.do(flight_key, _fetch_range_once, first, last, key, flight_key, save)
+        if not fetched:
+            logger.error("No prayer times available for %s", flight_key)
+            return None
+        for day in missing:
+            result[day.isoformat()] = fetched[day.isoformat()]
+    return result
@@ -0,0 +1,73 @@
+"""Immutable snapshots of the app's shared state.
+
+The tray thread, the scheduler's workers and background refreshes all read
+and change the current city and its prayer times. Instead of mutating
+globals, writers build a new AppState and publish it by swapping a single
+module-level reference, so readers take one snapshot with current() and see
+a city, its times and its next prayer that belong together, without locks.
+Writers are serialized by a lock so that no update is lost.
+"""
+import threading
+from datetime import datetime
+from types import MappingProxyType
+from typing import Mapping, NamedTuple
+
+from config import DEFAULT_CITY
+
+
+class AppState(NamedTuple):
+    city: str
+    # Read-only view of the city's times for today, or None if unknown
+    prayer_times: Mapping[str, str] | None = None
+    next_prayer_name: str | None = None
+    next_prayer_time: datetime | None = None
+    version: int = 0
+
+
+_state = AppState(DEFAULT_CITY)
+_write_lock = threading.Lock()
+
+
+def freeze(times: dict | None) -> Mapping[str, str] | None:
+    """Copy times into a read-only mapping safe to share between threads."""
+    return MappingProxyType(dict(times)) if times is not None else None
+
+
+def current() -> AppState:
+    """Return the latest published snapshot."""
+    return _state
+
+
+def _publish(new: AppState) -> AppState:
+    global _state
+    _state = new._replace(version=_state.version + 1)
+    return _state
+
+
+def update(fn) -> AppState | None:
+    """Publish fn(current_state), unless it returns the state unchanged.
+
+    fn runs under the write lock, so it must be quick and must not block;
+    do any fetching before calling update(). Returns the published state, or
+    None if fn declined to change anything.
+    """
+    with _write_lock:
+        new = fn(_state)
+        if new is _state:
+            return None
+        return _publish(new)
+
+
+def compare_and_set(expected: AppState, new: AppState) -> bool:
+    """Publish new only if expected is still the current snapshot."""
+    with _write_lock:
+        if _state is not expected:
+            return False
+        _publish(new)
+        return True
+
+
+def reset(city: str = DEFAULT_CITY) -> AppState:
+    """Start over from an empty state for city (startup and simulations)."""
+    with _write_lock:
+        return _publish(AppState(city))
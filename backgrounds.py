@@ -0,0 +1,157 @@
+import logging
+import os
+import threading
+from datetime import datetime
+
+import numpy as np
+from PIL import Image
+
+import clock
+from config import BACKGROUNDS_DIR, BACKGROUND_CACHE_SIZES, PRAYER_NAMES
+
+logger = logging.getLogger(__name__)
+
+# Bump when the palette or generator changes so stale disk caches are ignored
+BACKGROUND_VERSION = 1
+
+# Per phase: (sky top, sky bottom, horizon glow, glow strength 0..1)
+PHASE_THEMES = {
+    "Fajr": ("#0b1026", "#2a2140", "#6b4a6e", 0.35),
+    "Sunrise": ("#14223f", "#3b3450", "#c9845c", 0.45),
+    "Dhuhr": ("#0f2236", "#1c3650", "#3d6482", 0.20),
+    "Asr": ("#152033", "#2e3242", "#8a6d45", 0.25),
+    "Maghrib": ("#1a1024", "#3a1c2a", "#b0583c", 0.45),
+    "Isha": ("#05070f", "#0d0f1a", "#1c2240", 0.15),
+}
+
+# Serializes generation so two renders never build the same file at once
+_build_lock = threading.Lock()
+# Sizes kept in the disk cache; raised by set_cache_sizes when more are served
+_cache_sizes = BACKGROUND_CACHE_SIZES
+
+
+def set_cache_sizes(count: int) -> None:
+    """Keep backgrounds for at least count sizes (never fewer than BACKGROUND_CACHE_SIZES)."""
+    global _cache_sizes
+    _cache_sizes = max(count, BACKGROUND_CACHE_SIZES)
+
+
+def _rgb(hex_color: str) -> np.ndarray:
+    h = hex_color.lstrip("#")
+    return np.array([int(h[i:i + 2], 16) for i in (0, 2, 4)], dtype=np.float32)
+
+
+def current_phase(prayer_times: dict, now: datetime | None = None) -> str:
+    """Return the name of the latest prayer that has started (Isha before Fajr)."""
+    if now is None:
+        now = clock.now()
+    minutes_now = now.hour * 60 + now.minute
+    phase = "Isha"
+    for name in PRAYER_NAMES:
+        time_str = prayer_times.get(name, "").split(" ")[0]
+        try:
+            h, m = time_str.split(":")
+        except ValueError:
+            continue
+        if int(h) * 60 + int(m) <= minutes_now:
+            phase = name
+    return phase
+
+
+def render_background(phase: str, size: tuple[int, int]) -> Image.Image:
+    """Build the sky background for a phase with array math (no per-pixel loop).
+
+    A vertical gradient from sky top to bottom, plus an elliptical glow
+    centred just below the bottom edge to suggest the horizon.
+    """
+    width, height = size
+    top, bottom, glow, strength = PHASE_THEMES[phase]
+    top, bottom, glow = _rgb(top), _rgb(bottom), _rgb(glow)
+
+    # Vertical gradient: one row of colours per scanline, shape (h, 1, 3)
+    t = np.linspace(0.0, 1.0, height, dtype=np.float32)[:, None, None]
+    sky = top + (bottom - top) * t
+
+    # Horizon glow: normalised elliptical distance from (w/2, h*1.1)
+    ys = ((np.arange(height, dtype=np.float32) - height * 1.1) / (height * 0.9))[:, None]
+    xs = ((np.arange(width, dtype=np.float32) - width / 2) / (width * 0.8))[None, :]
+    weight = np.clip(1.0 - np.sqrt(xs * xs + ys * ys), 0.0, 1.0)
+    weight = (weight * weight * strength)[:, :, None]
+
+    pixels = sky + (glow - sky) * weight
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8), "RGB")
+
+
+def _prune_cache(keep: tuple[int, int], in_use=()) -> None:
+    """Delete cached backgrounds beyond the most recently used sizes.
+
+    keep and the sizes in in_use are never deleted; other sizes fill the
+    rest of the set_cache_sizes budget by recency. Files from older
+    BACKGROUND_VERSIONs are deleted too. Recency is the newest mtime among a
+    size's files; get_background touches files it reads.
+    """
+    prefix = f"v{BACKGROUND_VERSION}_"
+    by_size: dict[str, list[str]] = {}
+    last_used: dict[str, float] = {}
+    try:
+        names = os.listdir(BACKGROUNDS_DIR)
+    except OSError:
+        return
+    for name in names:
+        if not name.endswith(".png"):
+            continue
+        path = os.path.join(BACKGROUNDS_DIR, name)
+        if not name.startswith(prefix):
+            by_size.setdefault("", []).append(path)
+            last_used[""] = float("-inf")
+            continue
+        size_key = name.rsplit("_", 1)[-1]
+        by_size.setdefault(size_key, []).append(path)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            continue
+        last_used[size_key] = max(last_used.get(size_key, mtime), mtime)
+    pinned = {f"{w}x{h}.png" for w, h in (keep, *in_use)}
+    ranked = sorted((k for k in by_size if k and k not in pinned),
+                    key=lambda k: last_used.get(k, 0), reverse=True)
+    kept = pinned.union(ranked[:max(_cache_sizes - len(pinned), 0)])
+    for size_key, paths in by_size.items():
+        if size_key in kept:
+            continue
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def get_background(phase: str, size: tuple[int, int], in_use=()) -> Image.Image:
+    """Return the background for (phase, size) from the disk cache, building it once.
+
+    Callers keep the result for as long as the phase lasts; only the six
+    phase changes per day (per resolution) touch the disk. in_use lists
+    other sizes the caller still renders, whose files must not be pruned.
+    """
+    path = os.path.join(
+        BACKGROUNDS_DIR, f"v{BACKGROUND_VERSION}_{phase}_{size[0]}x{size[1]}.png",
+    )
+    with _build_lock:
+        if os.path.exists(path):
+            try:
+                with Image.open(path) as cached:
+                    img = cached.convert("RGB")
+                if img.size == size:
+                    os.utime(path)  # Recency for _prune_cache
+                    return img
+            except (IOError, OSError):
+                logger.warning("Failed to read cached background %s", path)
+
+        img = render_background(phase, size)
+        try:
+            img.save(path, "PNG")
+        except (IOError, OSError):
+            logger.warning("Failed to cache background %s", path)
+        _prune_cache(size, in_use)
+        logger.info("Generated %s background at %dx%d", phase, *size)
+        return img
@@ -0,0 +1,61 @@
+"""Time streaming timetable exports for every prayer zone over many years.
+
+Fetches come from simulation's synthetic provider and the app's cache is
+replaced with an empty in-memory one, so this measures export's own
+throughput (month chunking, gap fills and the writers) with no network.
+Output goes to os.devnull; with --memory, peak traced memory shows it
+stays flat (tracing slows the export down several times).
+
+    python benchmarks/bench_export.py [--years 10] [--start 2026-01-01] [--formats csv,jsonl,ics]
+                                      [--memory]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import api  # noqa: E402
+import export  # noqa: E402
+import providers  # noqa: E402
+from simulation import SimProvider  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--start", default="2026-01-01")
+    parser.add_argument("--formats", default="csv,jsonl,ics")
+    parser.add_argument("--memory", action="store_true", help="Trace peak memory")
+    args = parser.parse_args()
+
+    start = date.fromisoformat(args.start)
+    end = export.years_end(start, args.years)
+    cities = export.all_zone_cities()
+    provider = SimProvider()
+    providers.set_providers([provider])
+
+    print(f"{len(cities)} zones, {start} to {end}")
+    for fmt in args.formats.split(","):
+        api._cache = {}
+        provider.calls = 0
+        if args.memory:
+            tracemalloc.start()
+        began = time.perf_counter()
+        with open(os.devnull, "w", encoding="utf-8", newline="") as out:
+            rows = export.export(fmt, cities, start, end, out)
+        elapsed = time.perf_counter() - began
+        line = (f"  {fmt:<6}{rows:>10} rows in {elapsed:6.2f}s ({rows / elapsed:>9,.0f} rows/s), "
+                f"{provider.calls} provider days")
+        if args.memory:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            line += f", peak {peak / 2**20:.1f} MiB"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
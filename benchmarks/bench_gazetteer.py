@@ -0,0 +1,81 @@
+"""Benchmark nearest-zone and prefix lookups on the gazetteer.
+
+Runs against the bundled gazetteer and a synthetic one of --places entries
+scattered over Malaysia, checking the grid answers against a linear scan.
+
+    python benchmarks/bench_gazetteer.py [--places 10000] [--queries 20000]
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import gazetteer  # noqa: E402
+
+# Rough bounding box of Peninsular Malaysia, Sabah and Sarawak
+LAT_RANGE = (0.8, 7.4)
+LON_RANGE = (99.6, 119.3)
+
+
+def _synthetic(count: int) -> gazetteer.Gazetteer:
+    rng = random.Random(1)
+    places = []
+    for i in range(count):
+        name = "".join(rng.choices(string.ascii_lowercase, k=8)).title()
+        places.append(gazetteer.Place(f"{name} {i}", f"Z{i % 60:02d}",
+                                      rng.uniform(*LAT_RANGE), rng.uniform(*LON_RANGE)))
+    return gazetteer.Gazetteer([], places)
+
+
+def _linear_nearest(gaz: gazetteer.Gazetteer, lat: float, lon: float):
+    return min(gaz.places, key=lambda p: gazetteer._distance_sq(lat, lon, p.lat, p.lon))
+
+
+def bench(label: str, gaz: gazetteer.Gazetteer, queries: int) -> None:
+    rng = random.Random(2)
+    points = [(rng.uniform(*LAT_RANGE), rng.uniform(*LON_RANGE)) for _ in range(queries)]
+
+    t0 = time.perf_counter()
+    for lat, lon in points:
+        gaz.nearest(lat, lon)
+    elapsed = time.perf_counter() - t0
+
+    sample = points[:500]
+    t0 = time.perf_counter()
+    mismatches = sum(gaz.nearest(lat, lon) != _linear_nearest(gaz, lat, lon)
+                     for lat, lon in sample)
+    linear = (time.perf_counter() - t0) / len(sample)
+
+    prefixes = [p.name[:2] for p in rng.sample(gaz.places, min(len(gaz.places), 1000))]
+    t0 = time.perf_counter()
+    for _ in range(max(1, queries // len(prefixes))):
+        for prefix in prefixes:
+            gaz.search(prefix)
+    search_count = max(1, queries // len(prefixes)) * len(prefixes)
+    search_elapsed = time.perf_counter() - t0
+
+    print(f"{label}: {len(gaz.places)} places")
+    print(f"  nearest (grid):   {elapsed / queries * 1e6:8.1f} us")
+    print(f"  nearest (linear): {linear * 1e6:8.1f} us  ({mismatches} mismatches in {len(sample)})")
+    print(f"  prefix search:    {search_elapsed / search_count * 1e6:8.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--places", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=20000)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    bundled = gazetteer.Gazetteer.load()
+    print(f"Loaded bundled gazetteer in {(time.perf_counter() - t0) * 1000:.1f} ms")
+    bench("bundled", bundled, args.queries)
+    bench("synthetic", _synthetic(args.places), args.queries)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Benchmark Hijri conversion over large date ranges.
+
+    python benchmarks/bench_hijri.py [--years 100]
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hijri  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--years", type=int, default=100)
+    parser.add_argument("--start", default="1970-01-01")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    hijri.to_hijri(date.today())
+    print(f"Table build ({hijri.TABLE_START}..{hijri.TABLE_END}): "
+          f"{(time.perf_counter() - t0) * 1000:.1f} ms")
+
+    start = date.fromisoformat(args.start)
+    end = start + timedelta(days=round(365.2425 * args.years) - 1)
+
+    t0 = time.perf_counter()
+    count = sum(1 for _ in hijri.to_hijri_range(start, end))
+    elapsed = time.perf_counter() - t0
+    print(f"to_hijri_range: {count} dates in {elapsed * 1000:.1f} ms "
+          f"({count / elapsed / 1e6:.2f} M dates/s)")
+
+    days = [start + timedelta(days=i) for i in range(count)]
+    t0 = time.perf_counter()
+    for d in days:
+        hijri.to_hijri(d)
+    elapsed = time.perf_counter() - t0
+    print(f"to_hijri: {count} lookups in {elapsed * 1000:.1f} ms "
+          f"({elapsed / count * 1e9:.0f} ns each)")
+
+
+if __name__ == "__main__":
+    main()
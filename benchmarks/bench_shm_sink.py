@@ -0,0 +1,69 @@
+"""Compare frame hand-off cost: PNG file round trip vs shared-memory ring buffer.
+
+PNG path:  encode -> write file -> read file -> decode (what the OS does)
+SHM path:  copy raw RGB into the ring -> reader maps the latest slot
+
+    python benchmarks/bench_shm_sink.py [--width 3840 --height 2160] [--frames 20]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw  # noqa: E402
+
+from shm_sink import SharedFrameReader, SharedFrameSink  # noqa: E402
+
+
+def _frame(size, i):
+    img = Image.new("RGB", size, "#0d0d0d")
+    ImageDraw.Draw(img).text((40, 40), f"frame {i}", fill="#c9a84c")
+    return img
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--frames", type=int, default=20)
+    args = parser.parse_args()
+
+    size = (args.width, args.height)
+    frames = [_frame(size, i) for i in range(args.frames)]
+    mb = args.width * args.height * 3 / 2**20
+
+    path = os.path.join(tempfile.mkdtemp(prefix="waktusolat_bench_"), "frame.png")
+    start = time.perf_counter()
+    for img in frames:
+        img.save(path, "PNG")
+        with Image.open(path) as decoded:
+            decoded.load()
+    png = (time.perf_counter() - start) / args.frames
+
+    sink = SharedFrameSink(size, name="waktu_solat_bench")
+    reader = SharedFrameReader("waktu_solat_bench")
+    try:
+        start = time.perf_counter()
+        for img in frames:
+            sink.publish(img)
+            seq, view = reader.latest()
+            view[len(view) // 2]  # Touch the mapped frame
+            assert reader.is_current(seq)
+            view.release()
+        shm = (time.perf_counter() - start) / args.frames
+    finally:
+        reader.close()
+        sink.close()
+
+    print(f"{args.width}x{args.height} ({mb:.1f} MB raw), {args.frames} frames")
+    print(f"  PNG round trip: {png * 1000:8.2f} ms/frame  {1 / png:8.1f} fps")
+    print(f"  shared memory:  {shm * 1000:8.2f} ms/frame  {1 / shm:8.1f} fps  "
+          f"({mb / shm:.0f} MB/s)")
+    print(f"  speed-up: {png / shm:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Measure tray-loop tick jitter while wallpapers render, in-process vs in the worker.
+
+A thread ticks like tray._update_loop (sleep, then update the tooltip) and
+records how late each tick wakes, while another thread renders frames back
+to back, first on an idle app, then with wallpaper.generate_wallpaper in
+this process, then through render_worker.
+
+    python benchmarks/bench_tray_jitter.py [--width 3840 --height 2160] [--seconds 10] [--tick 0.05]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import render_worker  # noqa: E402
+import wallpaper  # noqa: E402
+from main import get_countdown  # noqa: E402
+
+TIMES = {"Fajr": "05:42", "Sunrise": "07:01", "Dhuhr": "13:07",
+         "Asr": "16:29", "Maghrib": "19:10", "Isha": "20:22"}
+
+
+def _measure(render_fn, seconds: float, tick: float) -> tuple[list[float], int]:
+    stop = time.monotonic() + seconds
+    renders = 0
+
+    def _render_loop():
+        nonlocal renders
+        while time.monotonic() < stop:
+            render_fn()
+            renders += 1
+
+    worker = None
+    if render_fn is not None:
+        worker = threading.Thread(target=_render_loop, daemon=True)
+        worker.start()
+
+    next_prayer = datetime.now() + timedelta(hours=1)
+    lateness = []
+    target = time.monotonic() + tick
+    while target < stop:
+        time.sleep(max(0.0, target - time.monotonic()))
+        lateness.append(time.monotonic() - target)
+        # What the tray does on each tick
+        _ = f"Asr in {get_countdown(next_prayer)}"
+        target += tick
+    if worker is not None:
+        worker.join()
+    return lateness, renders
+
+
+def _report(label: str, lateness: list[float], renders: int, seconds: float) -> None:
+    lateness = sorted(lateness)
+
+    def pct(p):
+        return lateness[min(len(lateness) - 1, int(len(lateness) * p))] * 1000
+
+    print(f"{label:<11} ticks={len(lateness):>5} renders={renders:>4} ({renders / seconds:4.1f}/s)  "
+          f"late ms: p50={pct(0.50):6.1f} p95={pct(0.95):6.1f} p99={pct(0.99):6.1f} "
+          f"max={lateness[-1] * 1000:6.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--width", type=int, default=3840)
+    parser.add_argument("--height", type=int, default=2160)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--tick", type=float, default=0.05, help="Tick interval (the tray uses 1s)")
+    args = parser.parse_args()
+
+    size = (args.width, args.height)
+    path = os.path.join(tempfile.mkdtemp(prefix="waktusolat_bench_"), "wallpaper.png")
+
+    def _in_process():
+        wallpaper.generate_wallpaper(TIMES, "Asr", "01:23:45", "Kuala Lumpur", size=size, path=path)
+
+    def _in_worker():
+        render_worker.render(TIMES, "Asr", "01:23:45", "Kuala Lumpur", size=size, path=path)
+
+    # Start the worker and load its fonts before measuring
+    _in_worker()
+
+    print(f"Rendering {args.width}x{args.height}, ticking every {args.tick * 1000:.0f} ms")
+    for label, fn in (("idle", None), ("in-process", _in_process), ("worker", _in_worker)):
+        lateness, renders = _measure(fn, args.seconds, args.tick)
+        _report(label, lateness, renders, args.seconds)
+    render_worker.shutdown()
+
+
+if __name__ == "__main__":
+    main()
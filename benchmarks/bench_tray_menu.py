@@ -0,0 +1,81 @@
+"""Time rebuilding the tray's location menu, as pystray does at startup and after every click.
+
+pystray's Windows backend turns the whole menu, every submenu included,
+into a native HMENU on each update_menu(). On Windows this times that
+conversion with the real backend (CreatePopupMenu/InsertMenuItem per
+entry). Elsewhere there is no native menu to build, so it times only the
+Python side of the same walk (each item's text, check and submenu), which
+is a lower bound.
+
+    python benchmarks/bench_tray_menu.py [--rebuilds 50]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pystray  # noqa: E402
+
+import tray  # noqa: E402
+from config import DEFAULT_CITY  # noqa: E402
+
+
+def _walk(menu) -> int:
+    """Evaluate every descriptor the way pystray's _win32._create_menu does."""
+    count = 0
+    for item in menu.items:
+        if item is pystray.Menu.SEPARATOR:
+            count += 1
+            continue
+        _ = (item.text, item.default, item.checked, item.enabled, item.radio)
+        count += 1
+        if item.submenu:
+            count += _walk(item.submenu)
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rebuilds", type=int, default=50)
+    args = parser.parse_args()
+
+    current = tray._CurrentLocation(lambda: DEFAULT_CITY)
+    recent = ["Seremban", "Kulai", "Kuching", DEFAULT_CITY]
+
+    started = time.perf_counter()
+    menu = tray._location_menu(lambda key: (lambda icon, item: None), current, lambda: recent)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    if sys.platform == "win32":
+        from pystray._util import win32
+
+        icon = pystray.Icon("bench", menu=menu)
+
+        def rebuild() -> int:
+            callbacks = []
+            win32.DestroyMenu(icon._create_menu(menu, callbacks))
+            return len(callbacks)
+        backend = "win32 HMENU"
+    else:
+        def rebuild() -> int:
+            return _walk(menu)
+        backend = "descriptor walk only (no native menu on this platform)"
+
+    started = time.perf_counter()
+    entries = rebuild()
+    first_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    for _ in range(args.rebuilds):
+        rebuild()
+    again_ms = (time.perf_counter() - started) * 1000 / args.rebuilds
+
+    print(f"{backend}: {entries} entries")
+    print(f"  construct menu objects: {build_ms:6.2f} ms")
+    print(f"  first rebuild:          {first_ms:6.2f} ms (builds every lazy submenu)")
+    print(f"  later rebuilds:         {again_ms:6.2f} ms each (startup and every click)")
+
+
+if __name__ == "__main__":
+    main()
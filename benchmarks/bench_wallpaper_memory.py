@@ -0,0 +1,65 @@
+"""Measure steady-state memory of generate_wallpaper over a simulated day.
+
+Renders one frame per simulated minute (1440 = 24 h by default) and reports
+Python heap usage (tracemalloc) and process RSS at intervals. With the
+canvas pool, both should flatten after the first render.
+
+    python benchmarks/bench_wallpaper_memory.py [--renders 1440] [--width 3840 --height 2160]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from wallpaper import generate_wallpaper  # noqa: E402
+
+PRAYER_TIMES = {
+    "Fajr": "05:42", "Sunrise": "07:01", "Dhuhr": "13:07",
+    "Asr": "16:29", "Maghrib": "19:10", "Isha": "20:22",
+}
+
+
+def _rss_mb() -> float:
+    """Current resident set size in MB (Linux /proc, else peak via resource)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--renders", type=int, default=1440)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--report-every", type=int, default=60)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="waktusolat_bench_"), "wallpaper.png")
+    size = (args.width, args.height)
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    print(f"{'minute':>6} {'heap MB':>8} {'heap peak':>9} {'RSS MB':>8}")
+    for minute in range(args.renders):
+        countdown = f"{(1440 - minute) // 60:02d}:{minute % 60:02d}:00"
+        generate_wallpaper(PRAYER_TIMES, "Asr", countdown, "Kuala Lumpur",
+                           size=size, path=path)
+        if minute % args.report_every == 0 or minute == args.renders - 1:
+            current, peak = tracemalloc.get_traced_memory()
+            print(f"{minute:>6} {current / 2**20:>8.2f} {peak / 2**20:>9.2f} {_rss_mb():>8.1f}")
+
+    elapsed = time.perf_counter() - start
+    print(f"{args.renders} renders at {size[0]}x{size[1]} in {elapsed:.1f}s "
+          f"({elapsed / args.renders * 1000:.1f} ms/render)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Load-test a running server.py and report throughput and latency percentiles.
+
+Each worker thread holds one keep-alive connection and cycles through the
+given paths for the test duration. With --revalidate, requests carry the
+ETag from the previous response so the 304 path is measured.
+
+    python server.py &
+    python benchmarks/loadtest_server.py --concurrency 16 --duration 10 \
+        /times/Kuala%20Lumpur/2026-10-19 "/wallpaper/Kuala%20Lumpur?w=1280&h=720"
+"""
+import argparse
+import http.client
+import threading
+import time
+from collections import Counter
+
+
+def _worker(host, port, paths, deadline, revalidate, latencies, statuses, lock):
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    etags = {}
+    local_latencies = []
+    local_statuses = Counter()
+    i = 0
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        headers = {"If-None-Match": etags[path]} if revalidate and path in etags else {}
+        start = time.perf_counter()
+        try:
+            conn.request("GET", path, headers=headers)
+            resp = conn.getresponse()
+            resp.read()
+        except (OSError, http.client.HTTPException):
+            local_statuses["error"] += 1
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+            continue
+        local_latencies.append(time.perf_counter() - start)
+        local_statuses[resp.status] += 1
+        if resp.getheader("ETag"):
+            etags[path] = resp.getheader("ETag")
+    conn.close()
+    with lock:
+        latencies.extend(local_latencies)
+        statuses.update(local_statuses)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--revalidate", action="store_true")
+    args = parser.parse_args()
+
+    latencies, statuses, lock = [], Counter(), threading.Lock()
+    deadline = time.perf_counter() + args.duration
+    threads = [
+        threading.Thread(target=_worker, args=(
+            args.host, args.port, args.paths, deadline, args.revalidate,
+            latencies, statuses, lock,
+        ))
+        for _ in range(args.concurrency)
+    ]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    if not latencies:
+        print("No successful requests", dict(statuses))
+        return
+    latencies.sort()
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    print(f"{len(latencies)} requests in {elapsed:.1f}s: {len(latencies) / elapsed:.1f} req/s")
+    print(f"status: {dict(statuses)}")
+    print(f"latency ms: p50={pct(0.50):.2f} p90={pct(0.90):.2f} "
+          f"p99={pct(0.99):.2f} max={latencies[-1] * 1000:.2f}")
+
+
+if __name__ == "__main__":
+    main()
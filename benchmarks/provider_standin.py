@@ -0,0 +1,114 @@
+"""Local stand-in prayer-time APIs with configurable latency, and a hedging demo.
+
+Starts an Aladhan-shaped and a JAKIM-shaped server on localhost, points the
+providers at them, and runs a series of hedged fetches, reporting which
+provider won and the caller-observed latency percentiles.
+
+    python benchmarks/provider_standin.py --aladhan-latency 0.05 --jakim-latency 0.4 \
+        --aladhan-jitter 0.5 --requests 200
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import providers  # noqa: E402
+
+TIMES = {"Fajr": "05:42", "Sunrise": "07:01", "Dhuhr": "13:07",
+         "Asr": "16:29", "Maghrib": "19:10", "Isha": "20:22"}
+
+# Each stand-in answers with its own Isha minute, so the result names the winner
+ISHA_BY_SHAPE = {"aladhan": "20:22", "jakim": "20:23"}
+WINNER_BY_ISHA = {isha: shape for shape, isha in ISHA_BY_SHAPE.items()}
+
+
+def make_handler(shape: str, latency: float, jitter: float, fail_rate: float):
+    class Handler(BaseHTTPRequestHandler):
+        def _respond(self):
+            # Heavy tail: `jitter` of requests take 10x the base latency
+            delay = latency * (10 if random.random() < jitter else 1)
+            time.sleep(delay)
+            if random.random() < fail_rate:
+                self.send_response(503)
+                self.end_headers()
+                return
+            times = {**TIMES, "Isha": ISHA_BY_SHAPE[shape]}
+            if shape == "aladhan":
+                body = {"data": {"timings": {k: f"{v} (+08)" for k, v in times.items()}}}
+            else:
+                fields = {"Fajr": "fajr", "Sunrise": "syuruk", "Dhuhr": "dhuhr",
+                          "Asr": "asr", "Maghrib": "maghrib", "Isha": "isha"}
+                body = {"prayerTime": [{fields[k]: f"{v}:00" for k, v in times.items()}],
+                        "status": "OK!"}
+            data = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        do_GET = _respond
+        do_POST = _respond
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def serve(shape: str, latency: float, jitter: float, fail_rate: float) -> str:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(shape, latency, jitter, fail_rate))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--aladhan-latency", type=float, default=0.05)
+    parser.add_argument("--aladhan-jitter", type=float, default=0.1)
+    parser.add_argument("--aladhan-fail", type=float, default=0.0)
+    parser.add_argument("--jakim-latency", type=float, default=0.1)
+    parser.add_argument("--jakim-jitter", type=float, default=0.0)
+    parser.add_argument("--jakim-fail", type=float, default=0.0)
+    parser.add_argument("--requests", type=int, default=100)
+    args = parser.parse_args()
+
+    aladhan_url = serve("aladhan", args.aladhan_latency, args.aladhan_jitter, args.aladhan_fail)
+    aladhan = providers.AladhanProvider(aladhan_url, aladhan_url)
+    jakim = providers.JakimProvider(
+        serve("jakim", args.jakim_latency, args.jakim_jitter, args.jakim_fail))
+    providers.set_providers([aladhan, jakim])
+
+    winners = Counter()
+    latencies = []
+    day = datetime.now()
+    for _ in range(args.requests):
+        start = time.perf_counter()
+        times = providers.fetch(day, "Kuala Lumpur")
+        latencies.append(time.perf_counter() - start)
+        winners[WINNER_BY_ISHA[times["Isha"]] if times else "failed"] += 1
+
+    latencies.sort()
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    print(f"winners: {dict(winners)}")
+    print(f"latency ms: p50={pct(0.50):.1f} p95={pct(0.95):.1f} p99={pct(0.99):.1f} "
+          f"max={latencies[-1] * 1000:.1f}")
+    for p in providers.get_providers():
+        p95 = p.p95()
+        print(f"{p.name}: p95={p95 * 1000 if p95 else float('nan'):.1f} ms "
+              f"circuit={p.breaker.state}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Hammer main's state with concurrent city changes, refreshes and tooltip reads.
+
+API calls and rendering are replaced with stand-ins: each city's times
+carry a tag naming its prayer zone, fetches sleep for a random few
+milliseconds, and every render and tooltip read checks that the snapshot it
+used pairs a city with its own zone's times.
+
+    python benchmarks/stress_app_state.py [--seconds 10] [--threads 4]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import api  # noqa: E402
+import app_state  # noqa: E402
+import main as app  # noqa: E402
+import wallpaper  # noqa: E402
+from config import CITIES  # noqa: E402
+from settings_store import SettingsStore  # noqa: E402
+
+DISPLAY_TO_CITY = {display: city for city, display in CITIES.items()}
+
+
+def _fake_times(date=None, city=None):
+    time.sleep(random.uniform(0, 0.005))
+    zone = api.location_key(city)
+    return {
+        "Fajr": f"05:{int(zone[-2:]) + 10:02d}", "Sunrise": "07:00", "Dhuhr": "13:10",
+        "Asr": "16:30", "Maghrib": "19:20", "Isha": "20:30", "zone": zone,
+    }
+
+
+def _matches(prayer_times, city: str) -> bool:
+    return prayer_times is None or prayer_times["zone"] == api.location_key(city)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--threads", type=int, default=4, help="Threads per kind of caller")
+    args = parser.parse_args()
+
+    counts = Counter()
+    lock = threading.Lock()
+
+    def _record(kind: str, ok: bool) -> None:
+        with lock:
+            counts[kind] += 1
+            if not ok:
+                counts[f"{kind}_inconsistent"] += 1
+
+    def _render(prayer_times, next_prayer, countdown, city_display="", **kwargs):
+        city = DISPLAY_TO_CITY.get(city_display, city_display)
+        _record("renders", _matches(prayer_times, city))
+
+    # A real store on a throwaway file, rendering in this process so the
+    # stand-in renderer sees every frame
+    settings = SettingsStore(os.path.join(tempfile.mkdtemp(prefix="waktusolat_stress_"),
+                                          "settings.json"))
+    settings.render_worker = False
+    api.get_prayer_times = _fake_times
+    wallpaper.generate_wallpaper = _render
+    wallpaper.set_wallpaper = lambda path=None: None
+    app.get_settings = lambda: settings
+    app_state.reset()
+
+    stop = time.monotonic() + args.seconds
+    cities = list(CITIES)
+
+    def _city_changer():
+        while time.monotonic() < stop:
+            app.on_city_change(random.choice(cities))
+            _record("city_changes", True)
+
+    def _refresher():
+        while time.monotonic() < stop:
+            app.fetch_daily()
+            app.refresh_wallpaper()
+
+    def _background_refresh():
+        while time.monotonic() < stop:
+            city = random.choice(cities)
+            app._on_times_refreshed(api.location_key(city), app.clock.now().strftime("%Y-%m-%d"),
+                                    _fake_times(city=city))
+
+    def _reader():
+        while time.monotonic() < stop:
+            state = app_state.current()
+            _record("snapshots", _matches(state.prayer_times, state.city))
+            app.get_tray_info()
+
+    workers = [_city_changer, _refresher, _background_refresh, _reader]
+    threads = [threading.Thread(target=fn, daemon=True)
+               for fn in workers for _ in range(args.threads)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    final = app_state.current()
+    print(f"{len(threads)} threads for {elapsed:.1f}s, {final.version} states published")
+    for kind in ("city_changes", "renders", "snapshots"):
+        print(f"  {kind:<13}{counts[kind]:>10} ({counts[kind] / elapsed:,.0f}/s), "
+              f"{counts[kind + '_inconsistent']} inconsistent")
+    consistent = _matches(final.prayer_times, final.city)
+    print(f"  final state: {final.city} ({'consistent' if consistent else 'INCONSISTENT'})")
+    settings.flush()
+    # Zero operations means the callers are crashing, not that they are consistent
+    idle = [kind for kind in ("city_changes", "renders", "snapshots") if not counts[kind]]
+    if idle:
+        print(f"  no {', '.join(idle)} completed")
+    if idle or not consistent or any(k.endswith("_inconsistent") and n for k, n in counts.items()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import threading
+from datetime import datetime, timedelta
+
+
+class SystemClock:
+    """Wall-clock time from the OS."""
+
+    def now(self) -> datetime:
+        return datetime.now()
+
+
+class SimulatedClock:
+    """A clock that only moves when told to, for deterministic replays."""
+
+    def __init__(self, start: datetime):
+        self._now = start
+        self._lock = threading.Lock()
+
+    def now(self) -> datetime:
+        return self._now
+
+    def set(self, value: datetime) -> None:
+        with self._lock:
+            self._now = value
+
+    def advance(self, seconds: float) -> datetime:
+        with self._lock:
+            self._now += timedelta(seconds=seconds)
+            return self._now
+
+
+_clock = SystemClock()
+
+
+def now() -> datetime:
+    """Current local time from the active clock. Use instead of datetime.now()."""
+    return _clock.now()
+
+
+def get_clock():
+    return _clock
+
+
+def set_clock(clock) -> None:
+    """Install a clock (e.g. SimulatedClock) for the whole app."""
+    global _clock
+    _clock = clock
@@ -0,0 +1,66 @@
+"""Detect wall-clock jumps from suspend/resume or clock changes.
+
+After a laptop resumes, APScheduler's interval, cron and date jobs are all
+overdue at once; the ones beyond their misfire grace are skipped, so the
+wallpaper and notifications can stay on yesterday's data. The monitor
+checks the clock every few seconds and, when the time since its last check
+differs from the interval by more than a threshold, calls on_jump once so
+the app can rebuild today's state in a single catch-up run.
+"""
+import logging
+import threading
+from datetime import datetime
+
+import clock
+from config import CLOCK_CHECK_INTERVAL, CLOCK_JUMP_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+
+class ClockJumpMonitor:
+    """Calls on_jump(before, after) when the clock moves unexpectedly.
+
+    check() does one observation and can be driven by anything, such as a
+    simulated scheduler; start() runs it on a daemon thread.
+    """
+
+    def __init__(self, on_jump, interval: float = CLOCK_CHECK_INTERVAL,
+                 threshold: float = CLOCK_JUMP_THRESHOLD):
+        self.on_jump = on_jump
+        self.interval = interval
+        self.threshold = threshold
+        self.jumps = 0
+        self._last: datetime | None = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def check(self) -> bool:
+        """Compare the clock with the last check; return True if it jumped."""
+        now = clock.now()
+        last, self._last = self._last, now
+        if last is None:
+            return False
+        drift = (now - last).total_seconds() - self.interval
+        if abs(drift) <= self.threshold:
+            return False
+        self.jumps += 1
+        logger.info("Clock jumped %+.0fs (from %s to %s); catching up",
+                    drift, last.strftime("%Y-%m-%d %H:%M:%S"), now.strftime("%Y-%m-%d %H:%M:%S"))
+        try:
+            self.on_jump(last, now)
+        except Exception:
+            logger.exception("Catch-up after clock jump failed")
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def start(self) -> None:
+        self._last = clock.now()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="clock-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
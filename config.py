@@ -9,7 +9,9 @@ GITHUB_REPO = "amjadrushdan/waktu-solat"
 DEFAULT_CITY = "Kuala Lumpur"
 COUNTRY = "Malaysia"
 TIMEZONE = "Asia/Kuala_Lumpur"
-CALCULATION_METHOD = 3  # Muslim World League
+# Aladhan's JAKIM method (Fajr 20°, Isha 18°), so Aladhan agrees with e-Solat
+# and the hedged providers are interchangeable
+CALCULATION_METHOD = 17
 
 # Available cities (name -> display name for wallpaper)
 CITIES = {
@@ -29,6 +31,13 @@ CITIES = {
     "Putrajaya": "Putrajaya",
 }
 
+# A "lat,lon" location farther than this from every known place (e.g. outside
+# Malaysia) has no JAKIM zone
+MAX_PLACE_DISTANCE_KM = 75
+
+# Locations kept in the tray's "recent" section
+RECENT_CITIES_MAX = 5
+
 # Prayer names to display
 PRAYER_NAMES = ["Fajr", "Sunrise", "Dhuhr", "Asr", "Maghrib", "Isha"]
 
@@ -48,12 +57,20 @@ CACHE_DIR = os.path.join(BASE_DIR, "cache")
 ASSETS_DIR = os.path.join(BASE_DIR, "assets")
 CACHE_FILE = os.path.join(CACHE_DIR, "prayer_times.json")
 WALLPAPER_PATH = os.path.join(ASSETS_DIR, "wallpaper.png")
+WALLPAPER_NEXT_PATH = os.path.join(ASSETS_DIR, "wallpaper_next.png")  # Pre-rendered midnight frame
+GAZETTEER_FILE = os.path.join(ASSETS_DIR, "zones.json")  # JAKIM zones and places
 SETTINGS_FILE = os.path.join(CACHE_DIR, "settings.json")
+BACKGROUNDS_DIR = os.path.join(CACHE_DIR, "backgrounds")
+FRAME_CACHE_DIR = os.path.join(CACHE_DIR, "frames")
+PROFILES_DIR = os.path.join(CACHE_DIR, "profiles")
 LOG_FILE = os.path.join(BASE_DIR, "waktu_solat.log")
+UPDATE_CACHE_FILE = os.path.join(CACHE_DIR, "release_cache.json")
+SETTINGS_SAVE_DELAY = 2.0  # Seconds of quiet before settings are written
 
 # Ensure directories exist
 os.makedirs(CACHE_DIR, exist_ok=True)
 os.makedirs(ASSETS_DIR, exist_ok=True)
+os.makedirs(BACKGROUNDS_DIR, exist_ok=True)
 
 # Colors
 BG_COLOR = "#0d0d0d"
@@ -72,6 +89,68 @@ if not os.path.exists(FONT_BOLD_PATH):
 
 # API
 API_URL = "http://api.aladhan.com/v1/timingsByCity"
+API_COORDS_URL = "http://api.aladhan.com/v1/timings"  # /{DD-MM-YYYY}?latitude=&longitude=
+API_CALENDAR_URL = "http://api.aladhan.com/v1/calendar"  # /{YYYY}/{M}?latitude=&longitude=
+API_CALENDAR_BY_CITY_URL = "http://api.aladhan.com/v1/calendarByCity"  # /{YYYY}/{M}?city=
+JAKIM_API_URL = "https://www.e-solat.gov.my/index.php"
+
+# Hedged fetch: fire the next provider after the current one's p95 latency
+HEDGE_DEFAULT_DELAY = 1.0  # Seconds, before any latency has been observed
+HEDGE_MIN_DELAY = 0.2
+HEDGE_MAX_DELAY = 5.0
+
+# GitHub releases API (override to point at a local stand-in server)
+GITHUB_API_URL = os.environ.get(
+    "WAKTU_SOLAT_GITHUB_API_URL",
+    f"https://api.github.com/repos/{GITHUB_REPO}/releases/latest",
+)
+UPDATE_CHECK_INTERVAL = 6 * 60 * 60  # Seconds between automatic release checks
+UPDATE_MANUAL_CHECK_INTERVAL = 5 * 60  # Minimum seconds between manual checks
+UPDATE_MAX_BACKOFF = 24 * 60 * 60  # Cap for failure/rate-limit backoff
+
+# Logging
+LOG_MAX_BYTES = 1024 * 1024  # Rotate the log file at 1 MB
+LOG_BACKUP_COUNT = 3
+LOG_RATE_LIMIT_SECONDS = 60  # Window for suppressing repeated log messages
+
+# Shared-memory frame sink (render_format "SHM" or "PNG+SHM")
+SHM_FRAME_NAME = "waktu_solat_frames"
+SHM_FRAME_SLOTS = 3
+
+# Scheduling across suspend/resume and clock changes
+SCHEDULER_MISFIRE_GRACE = 60  # Seconds late a job may still run; later runs are skipped
+CLOCK_CHECK_INTERVAL = 5  # Seconds between wall-clock jump checks
+CLOCK_JUMP_THRESHOLD = 60  # Seconds of unexplained wall-clock drift that count as a jump
+CATCH_UP_RETRY_DELAY = 30  # Seconds before the first retry when catch-up couldn't get today's times
+CATCH_UP_RETRY_MAX_DELAY = 30 * 60  # Cap for the doubling retry delay
+MIDNIGHT_WARMUP_MINUTES = 5  # Prepare tomorrow's times, jobs and frame this long before midnight
+
+# Adaptive wallpaper refresh (refresh_mode "adaptive", presence.py)
+IDLE_THRESHOLD = 5 * 60  # Seconds without input before the user counts as away
+IDLE_REFRESH_INTERVAL = 15 * 60  # Seconds between renders while idle or the display is off
+BATTERY_REFRESH_INTERVAL = 5 * 60  # Seconds between renders on battery
+PRESENCE_CHECK_INTERVAL = 2  # Seconds between checks for the user coming back
+
+# Out-of-process rendering (render_worker.py)
+RENDER_WORKER_TIMEOUT = 60  # Seconds before a silent render worker is replaced
+
+# Profiling capture window (tray "Profile" item or "profiling_enabled" setting)
+PROFILE_WINDOW_SECONDS = 60
+PROFILE_TOP_ALLOCATIONS = 25
+
+# Headless HTTP server (server.py)
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8080
+FRAME_CACHE_BUDGET = 256 * 1024 * 1024  # Bytes of encoded frames kept in memory
+# /times only answers dates this many days either side of today, since every
+# day it fetches is added to cache/prayer_times.json
+SERVER_TIMES_MAX_DAYS = 31
+# Minimum sizes whose canvas and background wallpaper.py keeps in memory, and
+# whose backgrounds are kept in cache/backgrounds; the server raises both to
+# the number of sizes it is serving
+FRAME_POOL_SIZES = 3
+BACKGROUND_CACHE_SIZES = 4
+FRAME_SPILL_MAX_AGE = 24 * 60 * 60  # Seconds before spilled frames are deleted
 
 # Single instance port
 SINGLE_INSTANCE_PORT = 47832
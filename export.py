@@ -0,0 +1,201 @@
+"""Export timetables for many cities and years as CSV, iCalendar or JSON Lines.
+
+Rows are produced one month at a time: each prayer zone in the selection is
+fetched once per month (from the cache, or with one bulk request for the
+days it lacks) and its rows are written out before the next month is read,
+so memory stays flat however many cities and years are exported.
+
+    python export.py --format csv --cities "Kuala Lumpur,Seremban" --start 2026-01-01 \
+        --end 2026-12-31 [-o timetable.csv] [--save]
+    python export.py --format ics --all-zones --start 2026-01-01 --end 2035-12-31 -o all.ics
+"""
+import argparse
+import csv
+import json
+import logging
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+
+import api
+import gazetteer
+from config import DEFAULT_CITY, PRAYER_NAMES
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ["city", "zone", "date", *PRAYER_NAMES]
+
+# JAKIM times are Malaysian local time, which has no daylight saving
+ICS_TZID = "Asia/Kuala_Lumpur"
+
+
+def _months(start: date, end: date):
+    """Yield (first, last) day pairs covering start..end, split at month ends."""
+    first = start
+    while first <= end:
+        next_month = (first.replace(day=1) + timedelta(days=32)).replace(day=1)
+        last = min(end, next_month - timedelta(days=1))
+        yield first, last
+        first = next_month
+
+
+def years_end(start: date, years: int = 1) -> date:
+    """The last day of the span of years beginning at start.
+
+    A span starting on Feb 29 runs to the day before Feb 29 of the end
+    year, or to Feb 28 if that year has none.
+    """
+    year = start.year + years
+    try:
+        return start.replace(year=year) - timedelta(days=1)
+    except ValueError:
+        return date(year, 3, 1) - timedelta(days=1)
+
+
+def all_zone_cities() -> list[str]:
+    """One representative place name per prayer zone."""
+    gaz = gazetteer.get_gazetteer()
+    return [gaz.representative(code).name for code in gaz.zones if gaz.representative(code)]
+
+
+def iter_rows(cities: list[str], start: date, end: date, save: bool = False):
+    """Yield a row dict per city and day, ordered by date, then city.
+
+    Cities in the same prayer zone share one fetch per month. A city whose
+    times can't be had for a month is logged and left out of that month.
+    """
+    zones = {city: api.location_key(city) for city in cities}
+    zone_labels = {city: gazetteer.zone_for(city) or "" for city in cities}
+    for first, last in _months(start, end):
+        by_zone = {}
+        for city in cities:
+            key = zones[city]
+            if key not in by_zone:
+                by_zone[key] = api.get_prayer_times_range(first, last, city, save=save)
+                if by_zone[key] is None:
+                    logger.error("Skipping %s for %s..%s", key, first, last)
+        day = first
+        while day <= last:
+            date_str = day.isoformat()
+            for city in cities:
+                month = by_zone[zones[city]]
+                if month is None:
+                    continue
+                row = {"city": city, "zone": zone_labels[city], "date": date_str}
+                row.update((name, month[date_str][name]) for name in PRAYER_NAMES)
+                yield row
+            day += timedelta(days=1)
+
+
+def write_csv(rows, out) -> int:
+    writer = csv.DictWriter(out, fieldnames=FIELDS, lineterminator="\n")
+    writer.writeheader()
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def write_jsonl(rows, out) -> int:
+    count = 0
+    for row in rows:
+        out.write(json.dumps(row, ensure_ascii=False))
+        out.write("\n")
+        count += 1
+    return count
+
+
+def _ics_text(value: str) -> str:
+    return (value.replace("\\", "\\\\").replace(";", "\\;")
+            .replace(",", "\\,").replace("\n", "\\n"))
+
+
+def _ics_line(line: str) -> str:
+    """Fold a content line at 75 octets (RFC 5545 3.1) and end it with CRLF."""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line + "\r\n"
+    parts = []
+    limit = 75
+    while len(encoded) > limit:
+        cut = limit
+        while cut and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1  # Don't split a UTF-8 sequence
+        parts.append(encoded[:cut].decode("utf-8"))
+        encoded = encoded[cut:]
+        limit = 74  # Continuation lines start with a space
+    parts.append(encoded.decode("utf-8"))
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def write_ics(rows, out) -> int:
+    """One VEVENT per prayer; returns the number of rows (city-days) written."""
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    header = [
+        "BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//Waktu Solat//Timetable export//EN",
+        "CALSCALE:GREGORIAN", "X-WR-CALNAME:Waktu Solat",
+        "BEGIN:VTIMEZONE", f"TZID:{ICS_TZID}",
+        "BEGIN:STANDARD", "DTSTART:19700101T000000", "TZOFFSETFROM:+0800",
+        "TZOFFSETTO:+0800", "TZNAME:MYT", "END:STANDARD", "END:VTIMEZONE",
+    ]
+    out.write("".join(_ics_line(line) for line in header))
+    count = 0
+    for row in rows:
+        compact_date = row["date"].replace("-", "")
+        uid_place = "".join(c if c.isalnum() else "-" for c in row["city"])
+        city = _ics_text(row["city"])
+        for name in PRAYER_NAMES:
+            start = f"{compact_date}T{row[name].replace(':', '')}00"
+            out.write(_ics_line("BEGIN:VEVENT"))
+            out.write(_ics_line(f"UID:{compact_date}-{name}-{uid_place}@waktu-solat"))
+            out.write(_ics_line(f"DTSTAMP:{stamp}"))
+            out.write(_ics_line(f"DTSTART;TZID={ICS_TZID}:{start}"))
+            out.write(_ics_line(f"SUMMARY:{name} ({city})"))
+            out.write(_ics_line("TRANSP:TRANSPARENT"))
+            out.write(_ics_line("END:VEVENT"))
+        count += 1
+    out.write(_ics_line("END:VCALENDAR"))
+    return count
+
+
+WRITERS = {"csv": write_csv, "ics": write_ics, "jsonl": write_jsonl}
+
+
+def export(fmt: str, cities: list[str], start: date, end: date, out, save: bool = False) -> int:
+    """Stream the timetable for cities and start..end to out; return the rows written."""
+    return WRITERS[fmt](iter_rows(cities, start, end, save), out)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--format", choices=sorted(WRITERS), default="csv")
+    parser.add_argument("--cities", default=DEFAULT_CITY,
+                        help="Comma-separated places (gazetteer names or \"lat;lon\")")
+    parser.add_argument("--all-zones", action="store_true",
+                        help="Export every prayer zone, using one place per zone")
+    parser.add_argument("--start", default=None, help="YYYY-MM-DD (default: today)")
+    parser.add_argument("--end", default=None, help="YYYY-MM-DD (default: a year from start)")
+    parser.add_argument("-o", "--output", default="-", help="Output file (default: stdout)")
+    parser.add_argument("--save", action="store_true",
+                        help="Add fetched days to the app's prayer-times cache")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(name)s: %(message)s")
+    start_day = date.fromisoformat(args.start) if args.start else date.today()
+    end_day = date.fromisoformat(args.end) if args.end else years_end(start_day)
+    if args.all_zones:
+        selected = all_zone_cities()
+    else:
+        selected = [c.strip().replace(";", ",") for c in args.cities.split(",") if c.strip()]
+
+    began = time.perf_counter()
+    if args.output == "-":
+        written = export(args.format, selected, start_day, end_day, sys.stdout, args.save)
+    else:
+        newline = "" if args.format == "ics" else None
+        with open(args.output, "w", encoding="utf-8", newline=newline) as f:
+            written = export(args.format, selected, start_day, end_day, f, args.save)
+    elapsed = time.perf_counter() - began
+    print(f"{written} rows in {elapsed:.2f}s ({written / max(elapsed, 1e-9):,.0f} rows/s)",
+          file=sys.stderr)
@@ -0,0 +1,143 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from config import FRAME_CACHE_BUDGET, FRAME_SPILL_MAX_AGE
+
+logger = logging.getLogger(__name__)
+
+
+class FrameCache:
+    """Memory-budgeted LRU cache of encoded frames.
+
+    Keys are tuples such as (city, date, next_prayer, countdown_minute,
+    width, height, theme). When the in-memory total exceeds ``budget`` bytes
+    the least recently used frames are evicted, and written to ``spill_dir``
+    first if one is given, so a later miss can be served from disk instead of
+    re-rendering. Spilled frames older than FRAME_SPILL_MAX_AGE are pruned.
+    """
+
+    def __init__(self, budget: int = FRAME_CACHE_BUDGET, spill_dir: str | None = None):
+        self.budget = budget
+        self.spill_dir = spill_dir
+        self._frames: OrderedDict[tuple, bytes] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._pending: dict[tuple, threading.Event] = {}
+        self.hits = 0
+        self.spill_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    def _spill_path(self, key: tuple) -> str:
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()
+        return os.path.join(self.spill_dir, f"{digest}.frame")
+
+    def _insert(self, key: tuple, data: bytes) -> None:
+        """Store data under key and evict down to budget. Caller holds the lock."""
+        old = self._frames.pop(key, None)
+        if old is not None:
+            self._size -= len(old)
+        self._frames[key] = data
+        self._size += len(data)
+        while self._size > self.budget and len(self._frames) > 1:
+            old_key, old_data = self._frames.popitem(last=False)
+            self._size -= len(old_data)
+            self.evictions += 1
+            if self.spill_dir:
+                try:
+                    with open(self._spill_path(old_key), "wb") as f:
+                        f.write(old_data)
+                except OSError:
+                    logger.warning("Failed to spill frame to disk")
+                if self.evictions % 256 == 0:
+                    self._prune_spill()
+
+    def _prune_spill(self) -> None:
+        cutoff = time.time() - FRAME_SPILL_MAX_AGE
+        try:
+            with os.scandir(self.spill_dir) as entries:
+                for entry in entries:
+                    if entry.name.endswith(".frame") and entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
+        except OSError:
+            logger.warning("Failed to prune spilled frames")
+
+    def get(self, key: tuple) -> bytes | None:
+        with self._lock:
+            data = self._frames.get(key)
+            if data is not None:
+                self._frames.move_to_end(key)
+                self.hits += 1
+                return data
+        if self.spill_dir:
+            try:
+                with open(self._spill_path(key), "rb") as f:
+                    data = f.read()
+            except OSError:
+                data = None
+            if data is not None:
+                with self._lock:
+                    self.spill_hits += 1
+                    self._insert(key, data)
+                return data
+        return None
+
+    def put(self, key: tuple, data: bytes) -> None:
+        with self._lock:
+            self._insert(key, data)
+
+    def get_or_render(self, key: tuple, render_fn) -> bytes:
+        """Return the cached frame, or render it once even under concurrent misses."""
+        data = self.get(key)
+        if data is not None:
+            return data
+
+        with self._lock:
+            event = self._pending.get(key)
+            leader = event is None
+            if leader:
+                event = self._pending[key] = threading.Event()
+                self.misses += 1
+        if not leader:
+            event.wait()
+            data = self.get(key)
+            if data is not None:
+                return data
+            return self.get_or_render(key, render_fn)
+
+        try:
+            data = render_fn()
+            self.put(key, data)
+            return data
+        finally:
+            with self._lock:
+                del self._pending[key]
+            event.set()
+
+    def warm(self, key: tuple, render_fn) -> None:
+        """Render key in the background unless it is already cached or in flight."""
+        with self._lock:
+            if key in self._frames or key in self._pending:
+                return
+        threading.Thread(target=self.get_or_render, args=(key, render_fn), daemon=True).start()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.spill_hits + self.misses
+            return {
+                "frames": len(self._frames),
+                "bytes": self._size,
+                "budget": self.budget,
+                "hits": self.hits,
+                "spill_hits": self.spill_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": (self.hits + self.spill_hits) / lookups if lookups else 0.0,
+            }
+
@@ -0,0 +1,200 @@
+"""JAKIM prayer zones and the places in them, with coordinates.
+
+A location is either a place name from the bundled gazetteer
+(assets/zones.json, matched case-insensitively) or a "lat,lon" string,
+which resolves to the zone of the nearest known place if one is within
+MAX_PLACE_DISTANCE_KM.
+
+Nearest-place lookups go through a uniform lat/lon grid sized for about
+PLACES_PER_CELL places per cell: only the cells around the query point are
+searched, ring by ring, so a lookup touches a handful of places however
+large the gazetteer is. Name search is a bisect over the sorted,
+case-folded names.
+"""
+import json
+import logging
+import math
+import threading
+from bisect import bisect_left
+from typing import NamedTuple
+
+from config import GAZETTEER_FILE, MAX_PLACE_DISTANCE_KM
+
+logger = logging.getLogger(__name__)
+
+# Target grid density, and bounds on the cell size in degrees
+PLACES_PER_CELL = 2
+MIN_CELL_SIZE = 0.05
+MAX_CELL_SIZE = 2.0
+
+KM_PER_DEGREE = 111.2
+
+
+class Zone(NamedTuple):
+    code: str
+    state: str
+    description: str
+
+
+class Place(NamedTuple):
+    name: str
+    zone: str
+    lat: float
+    lon: float
+
+
+def _distance_sq(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Squared equirectangular distance in degrees of latitude."""
+    dx = (lon2 - lon1) * math.cos(math.radians((lat1 + lat2) / 2))
+    dy = lat2 - lat1
+    return dx * dx + dy * dy
+
+
+class Gazetteer:
+    def __init__(self, zones: list[Zone], places: list[Place]):
+        self.zones = {z.code: z for z in zones}
+        self.places = places
+        self._by_name = {p.name.casefold(): p for p in places}
+        self._names = sorted(self._by_name)
+        # The first place listed for each zone stands for the whole zone
+        self._zone_places: dict[str, Place] = {}
+        for p in places:
+            self._zone_places.setdefault(p.zone, p)
+        self.cell_size = self._pick_cell_size(places)
+        self._grid: dict[tuple[int, int], list[Place]] = {}
+        for p in places:
+            self._grid.setdefault(self._cell(p.lat, p.lon), []).append(p)
+        rows = [r for r, _ in self._grid] or [0]
+        cols = [c for _, c in self._grid] or [0]
+        # No ring beyond this can contain a place
+        self._max_ring = max(max(rows) - min(rows), max(cols) - min(cols)) + 1
+
+    @staticmethod
+    def _pick_cell_size(places: list[Place]) -> float:
+        if len(places) < 2:
+            return MAX_CELL_SIZE
+        height = max(p.lat for p in places) - min(p.lat for p in places)
+        width = max(p.lon for p in places) - min(p.lon for p in places)
+        size = math.sqrt(max(height * width, 1e-6) * PLACES_PER_CELL / len(places))
+        return min(max(size, MIN_CELL_SIZE), MAX_CELL_SIZE)
+
+    def _cell(self, lat: float, lon: float) -> tuple[int, int]:
+        return math.floor(lat / self.cell_size), math.floor(lon / self.cell_size)
+
+    @classmethod
+    def load(cls, path: str = GAZETTEER_FILE) -> "Gazetteer":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        zones = [Zone(z["zone"], z["state"], z["description"]) for z in data["zones"]]
+        places = [Place(p["name"], p["zone"], p["lat"], p["lon"]) for p in data["places"]]
+        return cls(zones, places)
+
+    def get(self, name: str) -> Place | None:
+        return self._by_name.get(name.strip().casefold())
+
+    def representative(self, zone: str) -> Place | None:
+        """The place whose times are fetched on behalf of its whole zone."""
+        return self._zone_places.get(zone)
+
+    def nearest(self, lat: float, lon: float) -> Place | None:
+        """Return the known place closest to (lat, lon)."""
+        row, col = self._cell(lat, lon)
+        cell = self.cell_size
+        # A cell in ring r is at least (r - 1) cells away in either axis
+        scale = math.cos(math.radians(min(abs(lat) + self._max_ring * cell, 89.0)))
+        best, best_d = None, math.inf
+        for ring in range(self._max_ring + 1):
+            if best is not None and best_d <= ((ring - 1) * cell * scale) ** 2:
+                break
+            for r in range(row - ring, row + ring + 1):
+                edge = r in (row - ring, row + ring)
+                step = 1 if edge else 2 * ring
+                for c in range(col - ring, col + ring + 1, step or 1):
+                    for p in self._grid.get((r, c), ()):
+                        d = _distance_sq(lat, lon, p.lat, p.lon)
+                        if d < best_d:
+                            best, best_d = p, d
+        return best
+
+    def search(self, prefix: str, limit: int = 10) -> list[Place]:
+        """Places whose name starts with prefix (case-insensitive), alphabetically."""
+        prefix = prefix.strip().casefold()
+        results = []
+        i = bisect_left(self._names, prefix)
+        while i < len(self._names) and len(results) < limit:
+            name = self._names[i]
+            if not name.startswith(prefix):
+                break
+            results.append(self._by_name[name])
+            i += 1
+        return results
+
+    def resolve(self, location: str) -> Place | None:
+        """Resolve a place name or a "lat,lon" string to a Place.
+
+        Coordinates more than MAX_PLACE_DISTANCE_KM from every known place
+        resolve to None rather than to a far-off zone.
+        """
+        place = self.get(location)
+        if place is not None:
+            return place
+        coords = parse_coordinates(location)
+        if coords is None:
+            return None
+        nearest = self.nearest(*coords)
+        if nearest is None:
+            return None
+        limit = MAX_PLACE_DISTANCE_KM / KM_PER_DEGREE
+        if _distance_sq(*coords, nearest.lat, nearest.lon) > limit * limit:
+            return None
+        return Place(location, nearest.zone, *coords)
+
+
+def parse_coordinates(location: str) -> tuple[float, float] | None:
+    """'3.139, 101.687' -> (3.139, 101.687), or None if not coordinates."""
+    lat, sep, lon = location.partition(",")
+    if not sep:
+        return None
+    try:
+        lat, lon = float(lat), float(lon)
+    except ValueError:
+        return None
+    if -90 <= lat <= 90 and -180 <= lon <= 180:
+        return lat, lon
+    return None
+
+
+_gazetteer: Gazetteer | None = None
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer() -> Gazetteer:
+    """Return the bundled gazetteer, loading it on first use."""
+    global _gazetteer
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                try:
+                    _gazetteer = Gazetteer.load()
+                except (OSError, ValueError, KeyError):
+                    logger.error("Failed to load gazetteer from %s", GAZETTEER_FILE)
+                    _gazetteer = Gazetteer([], [])
+    return _gazetteer
+
+
+def resolve(location: str) -> Place | None:
+    return get_gazetteer().resolve(location)
+
+
+def zone_for(location: str) -> str | None:
+    """JAKIM zone code for a place name or "lat,lon", or None if unknown."""
+    place = resolve(location)
+    return place.zone if place else None
+
+
+def representative(zone: str) -> Place | None:
+    return get_gazetteer().representative(zone)
+
+
+def search(prefix: str, limit: int = 10) -> list[Place]:
+    return get_gazetteer().search(prefix, limit)
@@ -0,0 +1,89 @@
+import threading
+from array import array
+from datetime import date
+
+# Malaysian spelling of the Hijri months
+HIJRI_MONTHS = [
+    "Muharram", "Safar", "Rabiulawal", "Rabiulakhir",
+    "Jamadilawal", "Jamadilakhir", "Rejab", "Syaaban",
+    "Ramadan", "Syawal", "Zulkaedah", "Zulhijjah",
+]
+
+# Range covered by the precomputed table; dates outside fall back to arithmetic
+TABLE_START = date(1950, 1, 1)
+TABLE_END = date(2100, 12, 31)
+
+# Julian day number of 1 Muharram 1 AH (16 July 622, Julian calendar)
+_ISLAMIC_EPOCH = 1948440
+# date.toordinal() + this = Julian day number
+_ORDINAL_TO_JDN = 1721425
+
+# Packed year * 512 + month * 32 + day for every day in the table
+_table: array | None = None
+_table_lock = threading.Lock()
+
+
+def _arithmetic(jdn: int) -> tuple[int, int, int]:
+    """Tabular Islamic calendar (30-year cycle, leap years 2,5,7,10,13,16,18,21,24,26,29)."""
+    days = jdn - _ISLAMIC_EPOCH
+    year = (30 * days + 10646) // 10631
+    # Days elapsed before 1 Muharram of `year`
+    year_start = (year - 1) * 354 + (3 + 11 * year) // 30
+    day_of_year = days - year_start
+    month = min(12, (day_of_year * 2 + 59) // 59)
+    month_start = (59 * (month - 1) + 1) // 2
+    return year, month, day_of_year - month_start + 1
+
+
+def _build_table() -> array:
+    start = TABLE_START.toordinal() + _ORDINAL_TO_JDN
+    count = TABLE_END.toordinal() - TABLE_START.toordinal() + 1
+    table = array("I", [0]) * count
+    for i in range(count):
+        y, m, d = _arithmetic(start + i)
+        table[i] = y * 512 + m * 32 + d
+    return table
+
+
+def _get_table() -> array:
+    global _table
+    if _table is None:
+        with _table_lock:
+            if _table is None:
+                _table = _build_table()
+    return _table
+
+
+def to_hijri(day: date, offset: int = 0) -> tuple[int, int, int]:
+    """Convert a Gregorian date to (hijri_year, month, day).
+
+    ``offset`` shifts the result by whole days, to follow a regional
+    moon-sighting announcement. Within TABLE_START..TABLE_END this is a
+    single array lookup.
+    """
+    index = day.toordinal() - TABLE_START.toordinal() + offset
+    table = _get_table()
+    if 0 <= index < len(table):
+        packed = table[index]
+        return packed // 512, (packed // 32) % 16, packed % 32
+    return _arithmetic(day.toordinal() + _ORDINAL_TO_JDN + offset)
+
+
+def to_hijri_range(start: date, end: date, offset: int = 0):
+    """Yield (gregorian_date, (hijri_year, month, day)) for start..end inclusive."""
+    table = _get_table()
+    base = TABLE_START.toordinal()
+    for ordinal in range(start.toordinal(), end.toordinal() + 1):
+        index = ordinal - base + offset
+        if 0 <= index < len(table):
+            packed = table[index]
+            hijri = (packed // 512, (packed // 32) % 16, packed % 32)
+        else:
+            hijri = _arithmetic(ordinal + _ORDINAL_TO_JDN + offset)
+        yield date.fromordinal(ordinal), hijri
+
+
+def format_hijri(day: date, offset: int = 0) -> str:
+    """Return e.g. '12 Rejab 1447H'."""
+    year, month, d = to_hijri(day, offset)
+    return f"{d} {HIJRI_MONTHS[month - 1]} {year}H"
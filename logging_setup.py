@@ -0,0 +1,154 @@
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+
+from config import LOG_FILE, LOG_MAX_BYTES, LOG_BACKUP_COUNT, LOG_RATE_LIMIT_SECONDS
+
+LOG_FORMAT = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
+
+_listener: logging.handlers.QueueListener | None = None
+_rate_limit: "RateLimitFilter | None" = None
+
+
+class RateLimitFilter(logging.Filter):
+    """Drop repeats of the same INFO message from the same logger.
+
+    Records are compared by their formatted message, so the same template
+    with different arguments (another city, another date) is never merged.
+    WARNING and above always pass. The first record for a (logger, message)
+    pair passes; repeats within ``window`` seconds are dropped and counted.
+    The count is reported on the next repeat after the window, or by a
+    summary record once the window has passed with no repeat.
+    """
+
+    def __init__(self, window: float = LOG_RATE_LIMIT_SECONDS):
+        super().__init__()
+        self.window = window
+        self._seen: dict[tuple[str, str], list] = {}
+        self._last_sweep = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _sweep(self, now: float) -> list[tuple[str, str, int]]:
+        """Forget expired entries; return the suppressed counts they still owed."""
+        owed = []
+        for key, (first, suppressed) in list(self._seen.items()):
+            if now - first >= self.window:
+                del self._seen[key]
+                if suppressed:
+                    owed.append((*key, suppressed))
+        self._last_sweep = now
+        return owed
+
+    def flush(self) -> None:
+        """Report every pending suppressed count now (e.g. at shutdown)."""
+        with self._lock:
+            owed = [(*key, n) for key, (_, n) in self._seen.items() if n]
+            self._seen.clear()
+        self._report(owed)
+
+    @staticmethod
+    def _report(owed: list[tuple[str, str, int]]) -> None:
+        for name, message, suppressed in owed:
+            logging.getLogger(name).info("%s (%d similar suppressed)", message, suppressed)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not logging.INFO <= record.levelno < logging.WARNING:
+            return True
+        key = (record.name, record.getMessage())
+        now = time.monotonic()
+        owed = []
+        with self._lock:
+            entry = self._seen.get(key)
+            if entry is not None and now - entry[0] < self.window:
+                entry[1] += 1
+                return False
+            suppressed = entry[1] if entry is not None else 0
+            self._seen[key] = [now, 0]
+            if now - self._last_sweep >= self.window:
+                owed = self._sweep(now)
+        if suppressed:
+            record.msg = f"{record.getMessage()} ({suppressed} similar suppressed)"
+            record.args = None
+        # Logged outside the lock, since these records pass through this filter too
+        self._report(owed)
+        return True
+
+
+class DebugSamplingFilter(logging.Filter):
+    """Pass only one in every ``rate`` DEBUG records per message template."""
+
+    def __init__(self, rate: int):
+        super().__init__()
+        self.rate = max(1, rate)
+        self._counts: dict[tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno != logging.DEBUG:
+            return True
+        key = (record.name, str(record.msg))
+        with self._lock:
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+        return count % self.rate == 0
+
+
+def setup_logging(debug_sample_rate: int | None = None) -> None:
+    """Route all logging through a queue drained by a background listener.
+
+    Callers only enqueue records; the rotating file handler (and console
+    handler when running from source) do their I/O on the listener thread.
+    ``debug_sample_rate`` (or WAKTU_SOLAT_LOG_DEBUG_SAMPLE) enables DEBUG
+    output, keeping one in every N records per message template.
+    """
+    global _listener, _rate_limit
+    if _listener is not None:
+        return
+
+    if debug_sample_rate is None:
+        try:
+            debug_sample_rate = int(os.environ.get("WAKTU_SOLAT_LOG_DEBUG_SAMPLE", "0"))
+        except ValueError:
+            debug_sample_rate = 0
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers: list[logging.Handler] = [
+        logging.handlers.RotatingFileHandler(
+            LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT,
+            encoding="utf-8",
+        )
+    ]
+    if not getattr(sys, "frozen", False):
+        handlers.append(logging.StreamHandler())
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    _rate_limit = RateLimitFilter()
+    queue_handler.addFilter(_rate_limit)
+    if debug_sample_rate:
+        queue_handler.addFilter(DebugSamplingFilter(debug_sample_rate))
+
+    root = logging.getLogger()
+    root.setLevel(logging.DEBUG if debug_sample_rate else logging.INFO)
+    root.addHandler(queue_handler)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _rate_limit is not None:
+        _rate_limit.flush()
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
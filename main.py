@@ -1,24 +1,23 @@
-import json
 import logging
-import os
 import socket
 import sys
+import threading
+import time
 from datetime import datetime, timedelta
 
+import app_state
+import clock
+import gazetteer
+import presence
+from clock_monitor import ClockJumpMonitor
 from config import (
-    SINGLE_INSTANCE_PORT, LOG_FILE, DEFAULT_CITY,
-    SETTINGS_FILE, CITIES,
+    SINGLE_INSTANCE_PORT, DEFAULT_CITY, CITIES, SCREEN_WIDTH, SCREEN_HEIGHT, WALLPAPER_NEXT_PATH,
+    CATCH_UP_RETRY_DELAY, CATCH_UP_RETRY_MAX_DELAY,
 )
+from logging_setup import setup_logging, shutdown_logging
+from profiling import profiled
+from settings_store import get_settings
 
-# Configure logging
-_log_handlers = [logging.FileHandler(LOG_FILE, encoding="utf-8")]
-if not getattr(sys, "frozen", False):
-    _log_handlers.append(logging.StreamHandler())
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
-    handlers=_log_handlers,
-)
 logger = logging.getLogger(__name__)
 
 
@@ -33,42 +32,33 @@ def enforce_single_instance():
         sys.exit(0)
 
 
-# --- Settings persistence ---
-
-def _load_settings() -> dict:
-    if os.path.exists(SETTINGS_FILE):
-        try:
-            with open(SETTINGS_FILE, "r") as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError):
-            pass
-    return {}
-
-
-def _save_settings(settings: dict) -> None:
-    try:
-        with open(SETTINGS_FILE, "w") as f:
-            json.dump(settings, f, indent=2)
-    except IOError:
-        logger.error("Failed to save settings")
-
-
 # --- App state ---
-_prayer_times: dict | None = None
-_next_prayer_name: str | None = None
-_next_prayer_time: datetime | None = None
-_current_city: str = DEFAULT_CITY
+# City most recently asked for via on_city_change(); older requests still
+# fetching when a newer one arrives are dropped instead of published
+_requested_city: str = DEFAULT_CITY
+_monitor: ClockJumpMonitor | None = None
+# Set when refresh_mode is "adaptive"; None renders on every tick
+_refresh_policy: presence.AdaptiveRefresh | None = None
 
 
 def get_current_city() -> str:
-    return _current_city
+    return app_state.current().city
+
 
+def get_next_prayer(
+    prayer_times: dict,
+    city: str | None = None,
+    now: datetime | None = None,
+) -> tuple[str, datetime]:
+    """Return (prayer_name, prayer_datetime) for the next upcoming prayer.
 
-def get_next_prayer(prayer_times: dict) -> tuple[str, datetime]:
-    """Return (prayer_name, prayer_datetime) for the next upcoming prayer."""
+    city is used to look up tomorrow's Fajr and defaults to the current city;
+    now defaults to the clock's current time.
+    """
     from api import get_prayer_times as fetch_times
 
-    now = datetime.now()
+    if now is None:
+        now = clock.now()
 
     for name in ["Fajr", "Sunrise", "Dhuhr", "Asr", "Maghrib", "Isha"]:
         time_str = prayer_times.get(name, "")
@@ -84,7 +74,7 @@ def get_next_prayer(prayer_times: dict) -> tuple[str, datetime]:
 
     # All prayers passed — get tomorrow's Fajr
     tomorrow = now + timedelta(days=1)
-    tomorrow_times = fetch_times(tomorrow, city=_current_city)
+    tomorrow_times = fetch_times(tomorrow, city=city or get_current_city())
     if tomorrow_times:
         fajr_str = tomorrow_times.get("Fajr", "")
         if " " in fajr_str:
@@ -110,9 +100,9 @@ def get_next_prayer(prayer_times: dict) -> tuple[str, datetime]:
         return "Fajr", now + timedelta(hours=6)
 
 
-def get_countdown(next_prayer_time: datetime) -> str:
+def get_countdown(next_prayer_time: datetime, now: datetime | None = None) -> str:
     """Return countdown string in HH:MM:SS format."""
-    delta = next_prayer_time - datetime.now()
+    delta = next_prayer_time - (now or clock.now())
     if delta.total_seconds() < 0:
         return "00:00:00"
     total_secs = int(delta.total_seconds())
@@ -122,86 +112,371 @@ def get_countdown(next_prayer_time: datetime) -> str:
     return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
 
 
-def _update_next_prayer():
-    global _next_prayer_name, _next_prayer_time
-    if _prayer_times:
-        _next_prayer_name, _next_prayer_time = get_next_prayer(_prayer_times)
+def _snapshot() -> app_state.AppState:
+    """Return the current state with its next prayer up to date.
 
+    The next prayer is only recomputed once it has passed (or the times
+    changed). The result is published unless a newer state appeared
+    meanwhile; either way the returned snapshot is self-consistent.
+    """
+    state = app_state.current()
+    if not state.prayer_times:
+        return state
+    if state.next_prayer_time and state.next_prayer_time > clock.now():
+        return state
+    name, at = get_next_prayer(state.prayer_times, state.city)
+    updated = state._replace(next_prayer_name=name, next_prayer_time=at)
+    app_state.compare_and_set(state, updated)
+    return updated
 
-def refresh_wallpaper():
-    """Regenerate wallpaper with current prayer data and set it."""
-    from wallpaper import generate_wallpaper, set_wallpaper
 
-    _update_next_prayer()
+def _adopt_times(city: str, times: dict) -> bool:
+    """Publish times for city, unless the city changed while they were fetched."""
+    frozen = app_state.freeze(times)
+
+    def _apply(state):
+        if state.city != city:
+            return state
+        return state._replace(prayer_times=frozen, next_prayer_name=None, next_prayer_time=None)
+
+    return app_state.update(_apply) is not None
+
+
+def _render_frame(state: app_state.AppState, at: datetime | None = None,
+                  path: str | None = None, shm: bool = True) -> bool:
+    """Render state as it looks at `at` (default now); True if a PNG was written.
+
+    shm=False skips the shared-memory sink, for frames rendered ahead of time.
+    """
+    from wallpaper import generate_wallpaper
+
     countdown = ""
-    if _next_prayer_time:
-        countdown = get_countdown(_next_prayer_time)
+    if state.next_prayer_time:
+        countdown = get_countdown(state.next_prayer_time, now=at)
+
+    city_display = CITIES.get(state.city, state.city)
+
+    # render_format: "PNG" (desktop wallpaper), "SHM" (shared-memory frames
+    # for local overlay consumers), or "PNG+SHM"
+    render_format = get_settings().render_format.upper()
+    write_png = "PNG" in render_format
+    shm = shm and "SHM" in render_format
+
+    if get_settings().render_worker:
+        # Pillow work happens in another process so the tray stays responsive;
+        # None means a newer refresh superseded this one
+        import render_worker
+        rendered = render_worker.render(
+            state.prayer_times, state.next_prayer_name, countdown, city_display,
+            path=path, hijri_offset=get_settings().hijri_offset, at=at,
+            shm=shm, save=write_png,
+        )
+    else:
+        sink = None
+        if shm:
+            import shm_sink
+            sink = shm_sink.get_sink((SCREEN_WIDTH, SCREEN_HEIGHT))
+        generate_wallpaper(
+            state.prayer_times, state.next_prayer_name, countdown, city_display,
+            path=path, hijri_offset=get_settings().hijri_offset, at=at,
+            sink=sink, save=write_png,
+        )
+        rendered = True
+    return bool(rendered) and write_png
+
+
+@profiled("refresh_wallpaper")
+def refresh_wallpaper():
+    """Regenerate wallpaper with current prayer data and set it."""
+    from wallpaper import set_wallpaper
 
-    city_display = CITIES.get(_current_city, _current_city)
+    import render_worker
 
+    state = _snapshot()
+    # CPU spent on this thread plus in the render worker, for the refresh policy
+    started = time.thread_time() + render_worker.cpu_seconds()
     try:
-        generate_wallpaper(_prayer_times, _next_prayer_name, countdown, city_display)
-        set_wallpaper()
+        if _render_frame(state):
+            set_wallpaper()
     except Exception:
         logger.exception("Failed to refresh wallpaper")
+    if _refresh_policy is not None:
+        _refresh_policy.record_render(
+            time.thread_time() + render_worker.cpu_seconds() - started, _frame_key(state),
+        )
 
 
-def fetch_daily():
+def _frame_key(state: app_state.AppState) -> tuple:
+    """What a frame shows besides the countdown; a change is always worth a render."""
+    return state.city, state.next_prayer_name
+
+
+def refresh_tick():
+    """Scheduled refresh: skipped while the refresh policy says nobody would see it."""
+    if _refresh_policy is not None and not _refresh_policy.should_render(_frame_key(_snapshot())):
+        return
+    refresh_wallpaper()
+
+
+def check_presence():
+    """Render at once when the user returns to a wallpaper that skipped refreshes."""
+    if _refresh_policy is not None and _refresh_policy.poll():
+        logger.debug("User is back; refreshing wallpaper")
+        refresh_wallpaper()
+
+
+@profiled("fetch_daily")
+def fetch_daily(catch_up: bool = False):
     """Fetch today's prayer times from API for the current city."""
-    global _prayer_times
     from api import get_prayer_times as fetch_times
 
-    times = fetch_times(city=_current_city)
-    if times:
-        _prayer_times = times
-        logger.info("Daily prayer times updated for %s", _current_city)
+    city = get_current_city()
+    times = fetch_times(city=city)
+    if not times:
+        logger.warning("No daily prayer times for %s yet", city)
+        return
+    state = app_state.current()
+    if state.city == city and state.prayer_times is not None and dict(state.prayer_times) == times:
+        # Usually rollover() already published what prepare_tomorrow() staged,
+        # notification jobs included; only a resume has missed ones to show
+        logger.debug("Daily prayer times for %s already current", city)
+        if catch_up:
+            _schedule_notifications(catch_up)
+        return
+    if _adopt_times(city, times):
+        logger.info("Daily prayer times updated for %s", city)
+        _schedule_notifications(catch_up)
+
+
+# Held while catching up, so a burst of clock jumps costs one rebuild
+_catch_up_lock = threading.Lock()
+
+
+def catch_up(before: datetime, after: datetime):
+    """Rebuild today's times, notifications and wallpaper after a clock jump.
+
+    Called by clock_monitor after a suspend/resume or clock change, when the
+    scheduler has skipped whatever was missed.
+    """
+    if not _catch_up_lock.acquire(blocking=False):
+        return
+    try:
+        fetch_daily(catch_up=True)
+        refresh_wallpaper()
+        if not _showing_today():
+            # Usually the network isn't back yet a few seconds after resume
+            _schedule_catch_up_retry(0)
+    finally:
+        _catch_up_lock.release()
+
+
+def _showing_today() -> bool:
+    """Whether the published times are today's real entry, not a fallback."""
+    import api
+
+    state = app_state.current()
+    today = api.cached_prayer_times(clock.now(), state.city)
+    return today is not None and state.prayer_times is not None and dict(state.prayer_times) == today
+
+
+def _schedule_catch_up_retry(attempt: int) -> None:
+    import scheduler
+
+    sched = scheduler.get_scheduler()
+    if not sched:
+        return
+    delay = min(CATCH_UP_RETRY_DELAY * 2 ** attempt, CATCH_UP_RETRY_MAX_DELAY)
+    sched.add_job(
+        _retry_catch_up, "date", run_date=clock.now() + timedelta(seconds=delay),
+        args=[attempt], id="catch_up_retry", replace_existing=True,
+    )
+    logger.info("Today's prayer times not available yet; retrying in %ds", delay)
+
+
+def _retry_catch_up(attempt: int) -> None:
+    """Fetch today's times again, backing off until they are adopted."""
+    import api
+
+    if _showing_today():
+        return
+    city = get_current_city()
+    times = api.prefetch_prayer_times(clock.now(), city)
+    if times and _adopt_times(city, times):
+        logger.info("Caught up with today's prayer times for %s", city)
+        _schedule_notifications(catch_up=True)
+        refresh_wallpaper()
+        return
+    if not _showing_today():
+        _schedule_catch_up_retry(attempt + 1)
+
+
+def _on_times_refreshed(location_key: str, date_str: str, times: dict):
+    """Adopt today's times when a background refresh replaces a stale fallback."""
+    import api
+
+    city = get_current_city()
+    if (location_key != api.location_key(city)
+            or date_str != clock.now().strftime("%Y-%m-%d")):
+        return
+    if _adopt_times(city, times):
+        logger.info("Prayer times refreshed in background for %s", city)
         _schedule_notifications()
-    else:
-        logger.warning("Failed to fetch daily prayer times for %s", _current_city)
+        refresh_wallpaper()
+
+
+# (date, state to publish at that midnight, pre-rendered frame path or None)
+_prepared: tuple[str, app_state.AppState, str | None] | None = None
 
 
-def _schedule_notifications():
+@profiled("prepare_tomorrow")
+def prepare_tomorrow():
+    """Stage tomorrow before midnight: its times, notification jobs and first frame.
+
+    Nothing visible changes; rollover() publishes the staged state at
+    midnight, so the work is done minutes early instead of on the tick.
+    """
+    global _prepared
+    import api
+    import scheduler
+    from notifications import schedule_prayer_notifications
+
+    _prepared = None
+    state = app_state.current()
+    midnight = (clock.now() + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    times = api.prefetch_prayer_times(midnight, state.city)
+    if not times:
+        logger.warning("Could not prepare tomorrow's prayer times for %s", state.city)
+        return
+
+    name, at = get_next_prayer(times, state.city, now=midnight)
+    tomorrow = app_state.AppState(state.city, app_state.freeze(times), name, at)
+
+    sched = scheduler.get_scheduler()
+    if sched:
+        schedule_prayer_notifications(
+            sched, times, get_settings().notify_before_minutes, day=midnight,
+        )
+
+    frame = None
+    try:
+        if _render_frame(tomorrow, at=midnight, path=WALLPAPER_NEXT_PATH, shm=False):
+            frame = WALLPAPER_NEXT_PATH
+    except Exception:
+        logger.exception("Failed to pre-render tomorrow's wallpaper")
+
+    _prepared = (midnight.strftime("%Y-%m-%d"), tomorrow, frame)
+    logger.info("Prepared prayer times for %s", _prepared[0])
+
+
+@profiled("rollover")
+def rollover():
+    """At midnight, publish what prepare_tomorrow() staged, or fetch now if nothing was."""
+    global _prepared
+    from wallpaper import set_wallpaper
+
+    prepared, _prepared = _prepared, None
+    if prepared is None or prepared[0] != clock.now().strftime("%Y-%m-%d"):
+        fetch_daily()
+        refresh_wallpaper()
+        return
+
+    _, tomorrow, frame = prepared
+    if app_state.update(lambda s: tomorrow if s.city == tomorrow.city else s) is None:
+        # The city changed after tomorrow was prepared
+        fetch_daily()
+        refresh_wallpaper()
+        return
+
+    logger.info("Rolled over to %s", prepared[0])
+    if frame is None or "SHM" in get_settings().render_format.upper():
+        refresh_wallpaper()
+        return
+    try:
+        set_wallpaper(frame)
+    except Exception:
+        logger.exception("Failed to set pre-rendered wallpaper")
+
+
+def _schedule_notifications(catch_up: bool = False):
     """Schedule prayer notifications based on current prayer times."""
     import scheduler
     from notifications import schedule_prayer_notifications
 
     sched = scheduler.get_scheduler()
-    if sched and _prayer_times:
-        schedule_prayer_notifications(sched, _prayer_times)
+    prayer_times = app_state.current().prayer_times
+    if sched and prayer_times:
+        schedule_prayer_notifications(
+            sched, prayer_times, get_settings().notify_before_minutes, catch_up,
+        )
 
 
 def on_city_change(city_key: str):
     """Handle city switch from tray menu."""
-    global _current_city
-    if city_key == _current_city:
-        return
+    global _requested_city
+    from api import get_prayer_times as fetch_times
 
-    _current_city = city_key
+    if city_key == _requested_city:
+        return
+    _requested_city = city_key
     logger.info("City changed to: %s", city_key)
 
-    # Persist choice
-    settings = _load_settings()
-    settings["city"] = city_key
-    _save_settings(settings)
+    # Persist choice (debounced, so rapid clicks cost one write)
+    get_settings().city = city_key
+    get_settings().remember_city(city_key)
 
-    # Re-fetch and refresh immediately
-    fetch_daily()
+    # Fetch before publishing, so the new city never shows with the old
+    # city's times; a later click that arrived meanwhile wins
+    times = fetch_times(city=city_key)
+    frozen = app_state.freeze(times)
+
+    def _apply(state):
+        if _requested_city != city_key:
+            return state
+        return app_state.AppState(city_key, frozen)
+
+    if app_state.update(_apply) is None:
+        return
+    if not times:
+        # Nothing was cached, so the fetch runs in the background. If it landed
+        # before the city was published its listener call was dropped; pick
+        # the entry up from the cache instead. Later it reaches _on_times_refreshed.
+        import api
+        times = api.cached_prayer_times(clock.now(), city_key)
+        if times:
+            _adopt_times(city_key, times)
+    if times:
+        _schedule_notifications()
+    else:
+        logger.warning("No daily prayer times for %s yet", city_key)
     refresh_wallpaper()
 
 
+@profiled("tooltip")
 def get_tray_info() -> tuple[str | None, str | None]:
     """Return (next_prayer_name, countdown_str) for the tray tooltip."""
-    _update_next_prayer()
-    if _next_prayer_name and _next_prayer_time:
-        return _next_prayer_name, get_countdown(_next_prayer_time)
+    state = _snapshot()
+    if state.next_prayer_name and state.next_prayer_time:
+        return state.next_prayer_name, get_countdown(state.next_prayer_time)
     return None, None
 
 
 def on_exit():
     """Clean shutdown."""
     import scheduler
+    if _monitor is not None:
+        _monitor.stop()
     scheduler.stop()
+    if _refresh_policy is not None:
+        report = _refresh_policy.report()
+        logger.info("Adaptive refresh: %d renders, %d skipped (~%.1f CPU-seconds saved)",
+                    report["renders"], report["skipped"], report["cpu_seconds_saved"])
+    get_settings().flush()
+    import render_worker
+    render_worker.shutdown()
+    import shm_sink
+    shm_sink.close_sinks()
     logger.info("App exiting")
+    shutdown_logging()
 
 
 def _check_updates_background():
@@ -213,42 +488,61 @@ def _check_updates_background():
 
 
 def main():
-    global _current_city
+    global _requested_city, _monitor, _refresh_policy
 
+    import api
     import scheduler
     from tray import create_tray
 
     _lock = enforce_single_instance()
+    setup_logging()
 
     logger.info("Waktu Solat starting...")
 
+    if get_settings().profiling_enabled:
+        import profiling
+        profiling.start()
+
     # Load saved city preference
-    settings = _load_settings()
-    saved_city = settings.get("city")
-    if saved_city and saved_city in CITIES:
-        _current_city = saved_city
-        logger.info("Restored city preference: %s", _current_city)
+    saved_city = get_settings().city
+    known = saved_city in CITIES or gazetteer.resolve(saved_city) is not None
+    if known and saved_city != get_current_city():
+        _requested_city = saved_city
+        app_state.reset(saved_city)
+        logger.info("Restored city preference: %s", saved_city)
+
+    if get_settings().refresh_mode == "adaptive":
+        _refresh_policy = presence.AdaptiveRefresh()
 
     # 1. Fetch today's prayer times
+    api.add_refresh_listener(_on_times_refreshed)
     fetch_daily()
 
     # 2. Generate and set wallpaper immediately
     refresh_wallpaper()
 
     # 3. Start scheduler
-    scheduler.start(refresh_wallpaper, fetch_daily)
+    scheduler.start(refresh_tick, fetch_daily,
+                    prepare_tomorrow_fn=prepare_tomorrow, rollover_fn=rollover,
+                    presence_fn=check_presence if _refresh_policy is not None else None)
+    _monitor = ClockJumpMonitor(catch_up)
+    _monitor.start()
 
     # 4. Check for updates in the background (non-blocking)
-    import threading
     update_thread = threading.Thread(target=_check_updates_background, daemon=True)
     update_thread.start()
 
     # 5. Start tray icon (blocking)
     try:
-        create_tray(get_tray_info, refresh_wallpaper, on_exit, on_city_change, get_current_city)
+        create_tray(get_tray_info, refresh_wallpaper, on_exit, on_city_change, get_current_city,
+                    lambda: get_settings().recent_cities)
     except KeyboardInterrupt:
         on_exit()
 
 
 if __name__ == "__main__":
+    # The render worker is a spawned process; in a frozen build this lets
+    # the exe act as that process instead of starting another app
+    import multiprocessing
+    multiprocessing.freeze_support()
     main()
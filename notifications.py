@@ -1,14 +1,17 @@
 import logging
+import math
 from datetime import datetime, timedelta
 
 from winotify import Notification, audio
 
+import clock
+
 logger = logging.getLogger(__name__)
 
 # Minutes before prayer to send notification
 NOTIFY_BEFORE_MINUTES = 10
 
-# Job ID prefix for notification jobs
+# Job ID prefix for notification jobs, followed by the day and prayer name
 NOTIFICATION_JOB_PREFIX = "notify_"
 
 
@@ -28,19 +31,28 @@ def show_notification(prayer_name: str, minutes_until: int = NOTIFY_BEFORE_MINUT
         logger.exception("Failed to show notification for %s", prayer_name)
 
 
-def schedule_prayer_notifications(scheduler, prayer_times: dict) -> None:
+def schedule_prayer_notifications(
+    scheduler,
+    prayer_times: dict,
+    notify_before: int = NOTIFY_BEFORE_MINUTES,
+    catch_up: bool = False,
+    day: datetime | None = None,
+) -> None:
     """Schedule notifications for all upcoming prayers.
 
-    Clears existing notification jobs and schedules new ones
-    for prayers that haven't passed yet.
+    Replaces that day's notification jobs with new ones for prayers that
+    haven't passed yet, notify_before minutes ahead. With catch_up (after a
+    resume), a notification whose time was missed is shown now if its
+    prayer is still ahead. day is the date the times belong to (default
+    today), so tomorrow's jobs can be set up early; jobs for other days are
+    left alone.
     """
     if not prayer_times:
         return
 
-    # Clear existing notification jobs
-    clear_notification_jobs(scheduler)
-
-    now = datetime.now()
+    now = clock.now()
+    day = day or now
+    clear_notification_jobs(scheduler, day)
     prayers_to_notify = ["Fajr", "Dhuhr", "Asr", "Maghrib", "Isha"]  # Skip Sunrise
 
     for prayer_name in prayers_to_notify:
@@ -50,19 +62,26 @@ def schedule_prayer_notifications(scheduler, prayer_times: dict) -> None:
 
         try:
             h, m = time_str.split(":")
-            prayer_dt = now.replace(hour=int(h), minute=int(m), second=0, microsecond=0)
-            notify_dt = prayer_dt - timedelta(minutes=NOTIFY_BEFORE_MINUTES)
+            prayer_dt = day.replace(hour=int(h), minute=int(m), second=0, microsecond=0)
+            notify_dt = prayer_dt - timedelta(minutes=notify_before)
+
+            minutes_until = notify_before
+            if notify_dt <= now and catch_up and prayer_dt > now:
+                notify_dt = now
+                minutes_until = math.ceil((prayer_dt - now).total_seconds() / 60)
 
-            # Only schedule if notification time is in the future
-            if notify_dt > now:
-                job_id = f"{NOTIFICATION_JOB_PREFIX}{prayer_name}"
+            # Only schedule if notification time is in the future (or now, when catching up)
+            if notify_dt > now or (catch_up and notify_dt == now):
+                job_id = f"{_day_prefix(day)}{prayer_name}"
                 scheduler.add_job(
                     show_notification,
                     "date",
                     run_date=notify_dt,
-                    args=[prayer_name, NOTIFY_BEFORE_MINUTES],
+                    args=[prayer_name, minutes_until],
                     id=job_id,
                     replace_existing=True,
+                    # A notification is still useful until the prayer itself
+                    misfire_grace_time=max(1, int((prayer_dt - notify_dt).total_seconds())),
                 )
                 logger.info(
                     "Scheduled notification for %s at %s",
@@ -74,10 +93,15 @@ def schedule_prayer_notifications(scheduler, prayer_times: dict) -> None:
             continue
 
 
-def clear_notification_jobs(scheduler) -> None:
-    """Remove all existing notification jobs from the scheduler."""
+def _day_prefix(day: datetime) -> str:
+    return f"{NOTIFICATION_JOB_PREFIX}{day.strftime('%Y-%m-%d')}_"
+
+
+def clear_notification_jobs(scheduler, day: datetime | None = None) -> None:
+    """Remove the notification jobs for day, or all of them if day is None."""
+    prefix = NOTIFICATION_JOB_PREFIX if day is None else _day_prefix(day)
     jobs = scheduler.get_jobs()
     for job in jobs:
-        if job.id.startswith(NOTIFICATION_JOB_PREFIX):
+        if job.id.startswith(prefix):
             job.remove()
             logger.debug("Removed notification job: %s", job.id)
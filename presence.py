@@ -0,0 +1,221 @@
+"""Whether anyone can see the wallpaper, and how often it is worth rendering.
+
+A presence provider reports how long the user has been idle, whether the
+session is locked and whether the machine is on battery. AdaptiveRefresh
+(the "adaptive" refresh_mode) uses that to skip the minute-by-minute
+wallpaper refresh while the session is locked, thin it out while the user
+is idle or on battery, and ask for an immediate render once the user is
+back. The display timeout follows input idleness, so a screen that has
+turned itself off counts as idle.
+"""
+import ctypes
+import logging
+import sys
+from datetime import datetime
+from typing import NamedTuple
+
+import clock
+from config import BATTERY_REFRESH_INTERVAL, IDLE_REFRESH_INTERVAL, IDLE_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+
+class Presence(NamedTuple):
+    idle_seconds: float = 0.0
+    locked: bool = False
+    on_battery: bool = False
+
+
+class PresenceProvider:
+    """Reports a user who is always present: the fallback on unsupported platforms."""
+
+    def read(self) -> Presence:
+        return Presence()
+
+
+class FakePresenceProvider(PresenceProvider):
+    """Presence set by hand, for simulations and for testing off Windows."""
+
+    def __init__(self, idle_seconds: float = 0.0, locked: bool = False, on_battery: bool = False):
+        self.presence = Presence(idle_seconds, locked, on_battery)
+
+    def set(self, **fields) -> None:
+        self.presence = self.presence._replace(**fields)
+
+    def read(self) -> Presence:
+        return self.presence
+
+
+class _LastInputInfo(ctypes.Structure):
+    _fields_ = [("cbSize", ctypes.c_uint), ("dwTime", ctypes.c_uint)]
+
+
+class _SystemPowerStatus(ctypes.Structure):
+    _fields_ = [
+        ("ACLineStatus", ctypes.c_ubyte), ("BatteryFlag", ctypes.c_ubyte),
+        ("BatteryLifePercent", ctypes.c_ubyte), ("SystemStatusFlag", ctypes.c_ubyte),
+        ("BatteryLifeTime", ctypes.c_ulong), ("BatteryFullLifeTime", ctypes.c_ulong),
+    ]
+
+
+class WindowsPresenceProvider(PresenceProvider):
+    """Idle time, lock state and power source from user32/kernel32.
+
+    Each query that fails reads as "present", so a broken call can only
+    cost renders, never hide the wallpaper.
+    """
+
+    _DESKTOP_SWITCHDESKTOP = 0x0100
+
+    def __init__(self):
+        self._user32 = ctypes.windll.user32
+        self._kernel32 = ctypes.windll.kernel32
+
+    def _idle_seconds(self) -> float:
+        info = _LastInputInfo(ctypes.sizeof(_LastInputInfo), 0)
+        if not self._user32.GetLastInputInfo(ctypes.byref(info)):
+            return 0.0
+        # Both counters are 32-bit milliseconds and wrap every 49.7 days
+        return ((self._kernel32.GetTickCount() - info.dwTime) & 0xFFFFFFFF) / 1000
+
+    def _locked(self) -> bool:
+        # The secure desktop shown while locked can't be switched to by us.
+        # Failing to open the input desktop at all (UAC prompt, service
+        # context) is not proof of a lock, so it reads as unlocked.
+        desktop = self._user32.OpenInputDesktop(0, False, self._DESKTOP_SWITCHDESKTOP)
+        if not desktop:
+            return False
+        try:
+            return not self._user32.SwitchDesktop(desktop)
+        finally:
+            self._user32.CloseDesktop(desktop)
+
+    def _on_battery(self) -> bool:
+        status = _SystemPowerStatus()
+        if not self._kernel32.GetSystemPowerStatus(ctypes.byref(status)):
+            return False
+        return status.ACLineStatus == 0
+
+    def read(self) -> Presence:
+        try:
+            return Presence(self._idle_seconds(), self._locked(), self._on_battery())
+        except Exception:
+            logger.debug("Presence query failed", exc_info=True)
+            return Presence()
+
+
+def get_provider() -> PresenceProvider:
+    """The presence provider for this platform."""
+    if sys.platform == "win32":
+        try:
+            return WindowsPresenceProvider()
+        except Exception:
+            logger.warning("Presence detection unavailable; refreshing as if always present")
+    return PresenceProvider()
+
+
+class AdaptiveRefresh:
+    """Decides which scheduled wallpaper refreshes to skip.
+
+    While the session is locked nothing is rendered; while the user is idle
+    (or the display is off) a frame is rendered every idle_interval seconds,
+    on battery every battery_interval, and otherwise on every tick. A frame
+    whose content changes (another city or next prayer) is always rendered
+    unless the session is locked. poll() tells the caller to render at once
+    when the user comes back to a wallpaper that skipped refreshes.
+
+    Every render, scheduled or not, should be reported to record_render()
+    with the CPU time it took; skipped ticks are then valued at the average
+    cost of a render and summed per day.
+    """
+
+    def __init__(self, provider: PresenceProvider | None = None,
+                 idle_after: float = IDLE_THRESHOLD,
+                 idle_interval: float = IDLE_REFRESH_INTERVAL,
+                 battery_interval: float = BATTERY_REFRESH_INTERVAL):
+        self.provider = provider or get_provider()
+        self.idle_after = idle_after
+        self.idle_interval = idle_interval
+        self.battery_interval = battery_interval
+        self.renders = 0
+        self.skipped = 0
+        self.cpu_seconds = 0.0
+        self._last_render: datetime | None = None
+        self._last_key = None
+        self._stale = False
+        self._away = False
+        self._day = clock.now().date()
+        self._day_renders = 0
+        self._day_skipped = 0
+
+    def _is_away(self, presence: Presence) -> bool:
+        return presence.locked or presence.idle_seconds >= self.idle_after
+
+    def _interval(self, presence: Presence) -> float | None:
+        """Minimum seconds between renders; None while rendering is paused."""
+        if presence.locked:
+            return None
+        if presence.idle_seconds >= self.idle_after:
+            return self.idle_interval
+        if presence.on_battery:
+            return self.battery_interval
+        return 0
+
+    @property
+    def cpu_per_render(self) -> float:
+        return self.cpu_seconds / self.renders if self.renders else 0.0
+
+    def _roll_day(self, now: datetime) -> None:
+        if now.date() == self._day:
+            return
+        logger.info("Adaptive refresh on %s: %d renders, %d skipped (~%.1f CPU-seconds saved)",
+                    self._day.isoformat(), self._day_renders, self._day_skipped,
+                    self._day_skipped * self.cpu_per_render)
+        self._day = now.date()
+        self._day_renders = 0
+        self._day_skipped = 0
+
+    def should_render(self, key=None) -> bool:
+        """Whether a scheduled refresh of a frame showing key should render now."""
+        now = clock.now()
+        self._roll_day(now)
+        presence = self.provider.read()
+        self._away = self._is_away(presence)
+        interval = self._interval(presence)
+        if interval is not None:
+            if self._last_render is None or key != self._last_key:
+                return True
+            # A second of slack so a tick that wakes early still counts
+            if (now - self._last_render).total_seconds() >= interval - 1:
+                return True
+        self.skipped += 1
+        self._day_skipped += 1
+        self._stale = True
+        return False
+
+    def record_render(self, cpu_seconds: float, key=None) -> None:
+        """Note a render of a frame showing key that took cpu_seconds."""
+        now = clock.now()
+        self._roll_day(now)
+        self.renders += 1
+        self._day_renders += 1
+        self.cpu_seconds += cpu_seconds
+        self._last_render = now
+        self._last_key = key
+        self._stale = False
+
+    def poll(self) -> bool:
+        """Check presence; True if the user just came back to an outdated wallpaper."""
+        away = self._is_away(self.provider.read())
+        returned = self._away and not away
+        self._away = away
+        return returned and self._stale
+
+    def report(self) -> dict:
+        """Totals so far, with skipped renders valued at the average render cost."""
+        return {
+            "renders": self.renders,
+            "skipped": self.skipped,
+            "cpu_per_render": self.cpu_per_render,
+            "cpu_seconds_saved": self.skipped * self.cpu_per_render,
+        }
@@ -0,0 +1,167 @@
+import cProfile
+import functools
+import logging
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+
+from config import PROFILES_DIR, PROFILE_WINDOW_SECONDS, PROFILE_TOP_ALLOCATIONS
+
+logger = logging.getLogger(__name__)
+
+# Checked on every wrapped call; the only cost while profiling is off
+_active = False
+
+_lock = threading.Lock()
+_stats: dict[str, pstats.Stats] = {}
+_calls: dict[str, int] = {}
+_timer: threading.Timer | None = None
+_started_at = ""
+# Whether start() turned tracemalloc on, so stop() leaves other tracing alone
+_started_tracing = False
+# Latest top allocation sites reported from other processes, by name
+_allocations: dict[str, list[str]] = {}
+
+# cProfile allows one active profiler per process, so concurrent wrapped
+# calls on other threads run unprofiled rather than fail
+_profiler_lock = threading.Lock()
+
+
+def is_active() -> bool:
+    return _active
+
+
+def profiled(name: str):
+    """Decorator: profile calls with cProfile while a capture window is open."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _active:
+                return fn(*args, **kwargs)
+            return _call_profiled(name, fn, args, kwargs)
+        return wrapper
+    return decorator
+
+
+def _call_profiled(name: str, fn, args, kwargs):
+    if not _profiler_lock.acquire(blocking=False):
+        return fn(*args, **kwargs)
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profile.disable()
+    finally:
+        _profiler_lock.release()
+        with _lock:
+            if name in _stats:
+                _stats[name].add(profile)
+            else:
+                _stats[name] = pstats.Stats(profile)
+            _calls[name] = _calls.get(name, 0) + 1
+
+
+class _RawStats:
+    """cProfile stats captured in another process, in the form pstats.Stats loads."""
+
+    def __init__(self, stats: dict):
+        self.stats = stats
+
+    def create_stats(self) -> None:
+        pass
+
+
+def add_capture(name: str, stats: dict, allocations: list[str] | None = None) -> None:
+    """Merge a profile taken in another process into the open capture window.
+
+    stats is a cProfile.Profile's .stats after create_stats(); allocations
+    are that process's top allocation sites, as text lines.
+    """
+    with _lock:
+        if not _active:
+            return
+        if name in _stats:
+            _stats[name].add(_RawStats(stats))
+        else:
+            _stats[name] = pstats.Stats(_RawStats(stats))
+        _calls[name] = _calls.get(name, 0) + 1
+        if allocations is not None:
+            _allocations[name] = allocations
+
+
+def start(window: float = PROFILE_WINDOW_SECONDS) -> None:
+    """Open a capture window of `window` seconds; results are dumped when it closes."""
+    global _active, _timer, _started_at, _started_tracing
+    with _lock:
+        if _active:
+            return
+        _stats.clear()
+        _calls.clear()
+        _allocations.clear()
+        _started_at = time.strftime("%Y%m%d-%H%M%S")
+        _started_tracing = not tracemalloc.is_tracing()
+        if _started_tracing:
+            tracemalloc.start(10)
+        _timer = threading.Timer(window, stop)
+        _timer.daemon = True
+        _timer.start()
+        _active = True
+    logger.info("Profiling started for %ds", window)
+
+
+def stop() -> list[str]:
+    """Close the capture window and write .prof files and an allocation report.
+
+    Returns the paths written.
+    """
+    global _active, _timer, _started_tracing
+    with _lock:
+        if not _active:
+            return []
+        _active = False
+        if _timer is not None:
+            _timer.cancel()
+            _timer = None
+        stats = dict(_stats)
+        calls = dict(_calls)
+        allocations = dict(_allocations)
+        snapshot = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+        if _started_tracing:
+            tracemalloc.stop()
+            _started_tracing = False
+
+    os.makedirs(PROFILES_DIR, exist_ok=True)
+    written = []
+    for name, stat in stats.items():
+        path = os.path.join(PROFILES_DIR, f"{_started_at}_{name}.prof")
+        stat.dump_stats(path)
+        written.append(path)
+
+    if snapshot is not None:
+        path = os.path.join(PROFILES_DIR, f"{_started_at}_allocations.txt")
+        top = snapshot.statistics("lineno")[:PROFILE_TOP_ALLOCATIONS]
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"Calls profiled: {calls}\n\n")
+            f.write(f"Top {len(top)} allocation sites:\n")
+            for stat in top:
+                f.write(f"{stat}\n")
+            for name, lines in allocations.items():
+                f.write(f"\nTop {len(lines)} allocation sites in {name}:\n")
+                for line in lines:
+                    f.write(f"{line}\n")
+        written.append(path)
+
+    logger.info("Profiling stopped, wrote %d files to %s", len(written), PROFILES_DIR)
+    return written
+
+
+def toggle() -> None:
+    """Start a capture window, or end the current one early."""
+    if _active:
+        stop()
+    else:
+        start()
@@ -0,0 +1,310 @@
+import logging
+import threading
+from abc import ABC, abstractmethod
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import date, datetime, timedelta
+from urllib.parse import urlparse
+
+import requests
+
+import gazetteer
+from config import (
+    API_URL, API_COORDS_URL, API_CALENDAR_URL, API_CALENDAR_BY_CITY_URL, JAKIM_API_URL,
+    COUNTRY, CALCULATION_METHOD, PRAYER_NAMES,
+    HEDGE_DEFAULT_DELAY, HEDGE_MIN_DELAY, HEDGE_MAX_DELAY,
+)
+from resilience import CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="provider")
+
+
+def _normalize_time(value: str) -> str:
+    """'05:42 (+08)' or '05:42:00' -> '05:42'."""
+    h, m = value.strip().split(" ")[0].split(":")[:2]
+    return f"{int(h):02d}:{int(m):02d}"
+
+
+def _is_valid(times: dict | None) -> bool:
+    if not times:
+        return False
+    for name in PRAYER_NAMES:
+        h, _, m = times.get(name, "").partition(":")
+        if not (h.isdigit() and m.isdigit() and int(h) < 24 and int(m) < 60):
+            return False
+    return True
+
+
+class Provider(ABC):
+    """A prayer-times source returning {name: "HH:MM"} for PRAYER_NAMES.
+
+    Each provider tracks its own recent latencies and has a circuit breaker
+    keyed on its host.
+    """
+
+    name = "provider"
+
+    def __init__(self, base_url: str, timeout: float = 10):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.breaker = CircuitBreaker(urlparse(base_url).netloc or base_url)
+        self._latencies: deque[float] = deque(maxlen=50)
+        self._lock = threading.Lock()
+
+    def supports(self, city: str) -> bool:
+        return True
+
+    @abstractmethod
+    def fetch(self, day: datetime, city: str) -> dict:
+        """Return normalized times; raise on any failure."""
+
+    def fetch_range(self, start: date, end: date, city: str) -> dict[str, dict]:
+        """Return {"YYYY-MM-DD": times} for start..end inclusive; raise on failure.
+
+        Providers with a bulk endpoint override this; the default asks day by day.
+        """
+        result = {}
+        day = start
+        while day <= end:
+            result[day.isoformat()] = self.fetch(datetime.combine(day, datetime.min.time()), city)
+            day += timedelta(days=1)
+        return result
+
+    def record_latency(self, seconds: float) -> None:
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def p95(self) -> float | None:
+        with self._lock:
+            if not self._latencies:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+class AladhanProvider(Provider):
+    """Aladhan, by coordinates for gazetteer locations and by city name otherwise."""
+
+    name = "aladhan"
+
+    def __init__(self, base_url: str = API_URL, coords_url: str = API_COORDS_URL,
+                 timeout: float = 10, calendar_url: str = API_CALENDAR_URL,
+                 calendar_by_city_url: str = API_CALENDAR_BY_CITY_URL):
+        super().__init__(base_url, timeout)
+        self.coords_url = coords_url
+        self.calendar_url = calendar_url
+        self.calendar_by_city_url = calendar_by_city_url
+
+    def fetch(self, day: datetime, city: str) -> dict:
+        place = gazetteer.resolve(city)
+        if place is not None:
+            resp = requests.get(
+                f"{self.coords_url}/{day.strftime('%d-%m-%Y')}",
+                params={
+                    "latitude": place.lat,
+                    "longitude": place.lon,
+                    "method": CALCULATION_METHOD,
+                },
+                timeout=self.timeout,
+            )
+        else:
+            resp = requests.get(
+                self.base_url,
+                params={
+                    "city": city,
+                    "country": COUNTRY,
+                    "method": CALCULATION_METHOD,
+                    "date": day.strftime("%d-%m-%Y"),
+                },
+                timeout=self.timeout,
+            )
+        resp.raise_for_status()
+        timings = resp.json()["data"]["timings"]
+        return {name: _normalize_time(timings[name]) for name in PRAYER_NAMES}
+
+    def fetch_range(self, start: date, end: date, city: str) -> dict[str, dict]:
+        """One calendar request per month in the range."""
+        place = gazetteer.resolve(city)
+        if place is not None:
+            url = self.calendar_url
+            params = {"latitude": place.lat, "longitude": place.lon, "method": CALCULATION_METHOD}
+        else:
+            url = self.calendar_by_city_url
+            params = {"city": city, "country": COUNTRY, "method": CALCULATION_METHOD}
+
+        result = {}
+        year, month = start.year, start.month
+        while (year, month) <= (end.year, end.month):
+            resp = requests.get(f"{url}/{year}/{month}", params=params, timeout=self.timeout)
+            resp.raise_for_status()
+            for entry in resp.json()["data"]:
+                day = datetime.strptime(entry["date"]["gregorian"]["date"], "%d-%m-%Y").date()
+                if start <= day <= end:
+                    timings = entry["timings"]
+                    result[day.isoformat()] = {
+                        name: _normalize_time(timings[name]) for name in PRAYER_NAMES
+                    }
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return result
+
+
+class JakimProvider(Provider):
+    """JAKIM e-Solat, queried by the prayer zone the gazetteer gives for the location."""
+
+    name = "jakim"
+
+    # e-Solat field name for each of our prayer names
+    FIELDS = {
+        "Fajr": "fajr", "Sunrise": "syuruk", "Dhuhr": "dhuhr",
+        "Asr": "asr", "Maghrib": "maghrib", "Isha": "isha",
+    }
+
+    def __init__(self, base_url: str = JAKIM_API_URL, timeout: float = 10):
+        super().__init__(base_url, timeout)
+
+    def supports(self, city: str) -> bool:
+        return gazetteer.zone_for(city) is not None
+
+    def fetch(self, day: datetime, city: str) -> dict:
+        day_str = day.strftime("%Y-%m-%d")
+        resp = requests.post(
+            self.base_url,
+            params={"r": "esolatApi/takwimsolat", "period": "duration", "zone": gazetteer.zone_for(city)},
+            data={"datestart": day_str, "dateend": day_str},
+            timeout=self.timeout,
+        )
+        resp.raise_for_status()
+        entry = resp.json()["prayerTime"][0]
+        return {name: _normalize_time(entry[field]) for name, field in self.FIELDS.items()}
+
+    def fetch_range(self, start: date, end: date, city: str) -> dict[str, dict]:
+        """One "duration" request covering the whole range."""
+        resp = requests.post(
+            self.base_url,
+            params={"r": "esolatApi/takwimsolat", "period": "duration", "zone": gazetteer.zone_for(city)},
+            data={"datestart": start.isoformat(), "dateend": end.isoformat()},
+            timeout=self.timeout,
+        )
+        resp.raise_for_status()
+        result = {}
+        for entry in resp.json()["prayerTime"]:
+            day = datetime.strptime(entry["date"], "%d-%b-%Y").date()
+            result[day.isoformat()] = {
+                name: _normalize_time(entry[field]) for name, field in self.FIELDS.items()
+            }
+        return result
+
+
+_providers: list[Provider] = [AladhanProvider(), JakimProvider()]
+
+
+def get_providers() -> list[Provider]:
+    return list(_providers)
+
+
+def set_providers(providers: list[Provider]) -> None:
+    """Replace the provider list (e.g. with providers pointed at stand-in servers)."""
+    global _providers
+    _providers = list(providers)
+
+
+def rank(providers: list[Provider]) -> list[Provider]:
+    """Order providers by circuit state, then by p95 latency (unknown last)."""
+    def key(p: Provider):
+        p95 = p.p95()
+        return (p.breaker.state != CircuitBreaker.CLOSED, p95 is None, p95 or 0.0)
+    return sorted(providers, key=key)
+
+
+def _hedge_delay(provider: Provider) -> float:
+    p95 = provider.p95()
+    if p95 is None:
+        return HEDGE_DEFAULT_DELAY
+    return min(max(p95, HEDGE_MIN_DELAY), HEDGE_MAX_DELAY)
+
+
+def _run(provider: Provider, day: datetime, city: str) -> dict | None:
+    """Fetch from one provider, recording latency and breaker outcome."""
+    start = time.perf_counter()
+    try:
+        times = provider.fetch(day, city)
+    except Exception as e:
+        times = None
+        logger.warning("%s fetch failed for %s / %s: %s",
+                       provider.name, city, day.strftime("%Y-%m-%d"), e)
+    provider.record_latency(time.perf_counter() - start)
+    if _is_valid(times):
+        provider.breaker.record_success()
+        return times
+    provider.breaker.record_failure()
+    return None
+
+
+def fetch(day: datetime, city: str, providers: list[Provider] | None = None) -> dict | None:
+    """Fetch one day's times, hedging across providers.
+
+    The best-ranked provider is asked first. If it has not answered within
+    its p95 latency, the next one is fired as well; a failed answer fires the
+    next one immediately. The first valid answer wins and the losers finish
+    in the background, still feeding their latency and breaker stats.
+    Providers whose circuit is open are skipped.
+    """
+    candidates = [p for p in rank(providers or _providers) if p.supports(city)]
+    pending = {}
+
+    def _fire_next() -> bool:
+        while candidates:
+            provider = candidates.pop(0)
+            if provider.breaker.allow():
+                pending[_executor.submit(_run, provider, day, city)] = provider
+                return True
+        return False
+
+    if not _fire_next():
+        logger.debug("No provider available for %s", city)
+        return None
+
+    while pending:
+        latest = list(pending.values())[-1]
+        timeout = _hedge_delay(latest) if candidates else None
+        done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        if not done:
+            if _fire_next():
+                logger.debug("Hedging %s after %.2fs", city, timeout)
+            continue
+        for future in done:
+            provider = pending.pop(future)
+            times = future.result()
+            if times:
+                logger.debug("%s answered first for %s", provider.name, city)
+                return times
+        _fire_next()
+
+    return None
+
+
+def fetch_range(start: date, end: date, city: str,
+                providers: list[Provider] | None = None) -> dict[str, dict] | None:
+    """Fetch every day from start to end inclusive in bulk, from the first provider that can.
+
+    Bulk fetches are not hedged: providers are tried in rank order and the
+    first one returning a valid entry for every day wins.
+    """
+    days = (end - start).days + 1
+    for provider in rank(providers or _providers):
+        if not provider.supports(city) or not provider.breaker.allow():
+            continue
+        try:
+            result = provider.fetch_range(start, end, city)
+        except Exception as e:
+            result = None
+            logger.warning("%s bulk fetch failed for %s / %s..%s: %s",
+                           provider.name, city, start, end, e)
+        if result and len(result) == days and all(_is_valid(t) for t in result.values()):
+            provider.breaker.record_success()
+            return result
+        provider.breaker.record_failure()
+    return None
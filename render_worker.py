@@ -0,0 +1,308 @@
+"""Render wallpapers in a separate process.
+
+Drawing and PNG-encoding a 4K frame holds the GIL for long enough to stall
+the tray's tooltip loop and pystray's message handling. The worker process
+does that work instead; the app only sends the render inputs over a queue
+and waits for the result without holding the GIL.
+
+Requests are coalesced per output path: while a frame is being rendered
+only the newest pending request for each path is kept, and callers whose
+request was superseded get None back, so pre-rendering tomorrow's frame and
+refreshing today's never cancel each other. A worker that dies or hangs is
+replaced and the frame retried once. The worker's log records are sent
+back and handled by this process's logging, and while a profiling window
+is open each render is profiled in the worker and merged into it.
+"""
+import cProfile
+import logging
+import logging.handlers
+import multiprocessing
+import queue
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+import profiling
+from config import (
+    PROFILE_TOP_ALLOCATIONS, RENDER_WORKER_TIMEOUT, SCREEN_WIDTH, SCREEN_HEIGHT, WALLPAPER_PATH,
+)
+
+logger = logging.getLogger(__name__)
+
+# How often a waiting dispatcher checks that the worker is still alive
+_POLL_SECONDS = 0.5
+
+
+class _ForwardHandler(logging.Handler):
+    """Hands records from the worker to the logger of the same name here."""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        logging.getLogger(record.name).handle(record)
+
+
+def _worker_main(requests, results, logs=None, log_level: int = logging.INFO) -> None:
+    """Worker process loop: render each request as it arrives.
+
+    The dispatcher sends one request at a time and waits for its answer,
+    so there is never a backlog to skip. A request marked "profile" is run
+    under cProfile with tracemalloc on, and its stats and top allocation
+    sites are sent back with the answer.
+    """
+    if logs is not None:
+        root = logging.getLogger()
+        root.handlers[:] = [logging.handlers.QueueHandler(logs)]
+        root.setLevel(log_level)
+
+    import shm_sink
+    from wallpaper import generate_wallpaper
+
+    try:
+        while True:
+            request = requests.get()
+            if request is None:
+                break
+            seq, inputs = request
+            shm = inputs.pop("shm", False)
+            profile = cProfile.Profile() if inputs.pop("profile", False) else None
+            if (profile is not None) != tracemalloc.is_tracing():
+                if profile is not None:
+                    tracemalloc.start(10)
+                else:
+                    tracemalloc.stop()
+            started = time.process_time()
+            try:
+                sink = shm_sink.get_sink(inputs["size"]) if shm else None
+                if profile is not None:
+                    profile.enable()
+                try:
+                    generate_wallpaper(**inputs, sink=sink)
+                finally:
+                    if profile is not None:
+                        profile.disable()
+                result = (True, inputs.get("path") if inputs.get("save") else None)
+            except Exception as e:
+                logger.exception("Render failed")
+                result = (False, f"{type(e).__name__}: {e}")
+            cpu = time.process_time() - started
+            capture = None
+            if profile is not None:
+                profile.create_stats()
+                top = tracemalloc.take_snapshot().statistics("lineno")[:PROFILE_TOP_ALLOCATIONS]
+                capture = (profile.stats, [str(stat) for stat in top])
+            results.put((seq, *result, cpu, capture))
+    finally:
+        shm_sink.close_sinks()
+
+
+class _Job:
+    __slots__ = ("inputs", "done", "result")
+
+    def __init__(self, inputs: dict):
+        self.inputs = inputs
+        self.done = threading.Event()
+        self.result: str | bool | None = None
+
+    def finish(self, result) -> None:
+        self.result = result
+        self.done.set()
+
+
+class RenderWorker:
+    """A render process fed by a dispatcher thread, one frame at a time."""
+
+    def __init__(self, timeout: float = RENDER_WORKER_TIMEOUT):
+        self.timeout = timeout
+        self._ctx = multiprocessing.get_context("spawn")
+        self._process = None
+        self._requests = None
+        self._results = None
+        self._logs = None
+        self._log_listener: logging.handlers.QueueListener | None = None
+        self._seq = 0
+        self._cond = threading.Condition()
+        # Newest unstarted job per output path, oldest path first
+        self._pending: dict[str, _Job] = {}
+        self._dispatcher: threading.Thread | None = None
+        self._closed = False
+        self.renders = 0
+        self.coalesced = 0
+        self.restarts = 0
+        self.cpu_seconds = 0.0
+
+    def _start_process(self) -> None:
+        self._requests = self._ctx.Queue()
+        self._results = self._ctx.Queue()
+        self._logs = self._ctx.Queue()
+        self._log_listener = logging.handlers.QueueListener(self._logs, _ForwardHandler())
+        self._log_listener.start()
+        self._process = self._ctx.Process(
+            target=_worker_main,
+            args=(self._requests, self._results, self._logs, logging.getLogger().getEffectiveLevel()),
+            name="waktu-solat-render", daemon=True,
+        )
+        self._process.start()
+        logger.debug("Render worker started (pid %s)", self._process.pid)
+
+    def _stop_process(self, graceful: bool) -> None:
+        process, self._process = self._process, None
+        if process is None:
+            return
+        if graceful and process.is_alive():
+            self._requests.put(None)
+            process.join(5)
+        if process.is_alive():
+            process.kill()
+            process.join(5)
+        if self._log_listener is not None:
+            self._log_listener.stop()
+            self._log_listener = None
+
+    def _run_once(self, inputs: dict):
+        """Send one request and wait for its answer; raise RuntimeError if the worker died."""
+        if self._process is not None and not self._process.is_alive():
+            logger.warning("Render worker exited with %s; restarting it", self._process.exitcode)
+            self._stop_process(graceful=False)
+            self.restarts += 1
+        if self._process is None:
+            self._start_process()
+        self._seq += 1
+        seq = self._seq
+        self._requests.put((seq, inputs))
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                answer_seq, ok, value, cpu, capture = self._results.get(timeout=_POLL_SECONDS)
+            except queue.Empty:
+                if not self._process.is_alive():
+                    raise RuntimeError(f"render worker exited with {self._process.exitcode}")
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"render worker did not answer in {self.timeout}s")
+                continue
+            self.cpu_seconds += cpu
+            if capture is not None:
+                profiling.add_capture("render_worker", *capture)
+            if answer_seq != seq:
+                continue  # Answer to a request abandoned by an earlier restart
+            if not ok:
+                logger.error("Render failed in worker: %s", value)
+                return False
+            return value or True
+
+    def _run(self, inputs: dict):
+        for _ in range(2):
+            try:
+                return self._run_once(dict(inputs))
+            except RuntimeError as e:
+                logger.warning("%s; restarting it", e)
+                self._stop_process(graceful=False)
+                self.restarts += 1
+        return False
+
+    def _dispatch(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    for pending in self._pending.values():
+                        pending.finish(None)
+                    self._pending.clear()
+                    return
+                job = self._pending.pop(next(iter(self._pending)))
+            job.finish(self._run(job.inputs))
+            self.renders += 1
+
+    def submit(self, **inputs) -> _Job:
+        """Queue a render, replacing any unstarted request for the same output path."""
+        job = _Job(inputs)
+        target = inputs.get("path")
+        with self._cond:
+            if self._closed:
+                job.finish(None)
+                return job
+            superseded = self._pending.pop(target, None)
+            if superseded is not None:
+                superseded.finish(None)
+                self.coalesced += 1
+            self._pending[target] = job
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(
+                    target=self._dispatch, name="render-dispatch", daemon=True,
+                )
+                self._dispatcher.start()
+            self._cond.notify()
+        return job
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._dispatcher is not None:
+            self._dispatcher.join(self.timeout)
+        self._stop_process(graceful=True)
+
+    def stats(self) -> dict:
+        return {"renders": self.renders, "coalesced": self.coalesced, "restarts": self.restarts,
+                "cpu_seconds": self.cpu_seconds}
+
+
+_worker: RenderWorker | None = None
+_worker_lock = threading.Lock()
+
+
+def get_worker() -> RenderWorker:
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = RenderWorker()
+        return _worker
+
+
+def render(
+    prayer_times,
+    next_prayer: str | None,
+    countdown: str,
+    city_display: str = "",
+    size: tuple[int, int] | None = None,
+    path: str | None = None,
+    hijri_offset: int = 0,
+    at: datetime | None = None,
+    shm: bool = False,
+    save: bool = True,
+    timeout: float | None = None,
+) -> str | bool | None:
+    """Render in the worker process and wait for it.
+
+    Takes wallpaper.generate_wallpaper's arguments, except that the frame
+    goes to the shared-memory sink if shm is true. Returns the PNG path
+    (or True if save is false), False if rendering failed, and None if a
+    newer request for the same path superseded this one before it was rendered.
+    """
+    import clock
+
+    job = get_worker().submit(
+        prayer_times=dict(prayer_times) if prayer_times is not None else None,
+        next_prayer=next_prayer, countdown=countdown, city_display=city_display,
+        size=size or (SCREEN_WIDTH, SCREEN_HEIGHT), path=path or WALLPAPER_PATH,
+        hijri_offset=hijri_offset, at=at or clock.now(), shm=shm, save=save,
+        profile=profiling.is_active(),
+    )
+    if not job.done.wait(timeout):
+        return None
+    return job.result
+
+
+def cpu_seconds() -> float:
+    """CPU time the worker process has spent rendering, 0 if it never started."""
+    worker = _worker
+    return worker.cpu_seconds if worker is not None else 0.0
+
+
+def shutdown() -> None:
+    """Stop the worker process, if one was started."""
+    global _worker
+    with _worker_lock:
+        worker, _worker = _worker, None
+    if worker is not None:
+        worker.close()
@@ -0,0 +1,98 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """Per-host circuit breaker with half-open probing.
+
+    closed    -> requests flow; ``failure_threshold`` consecutive failures open it.
+    open      -> requests are refused until ``reset_timeout`` has elapsed.
+    half_open -> a single probe request is let through; success closes the
+                 circuit, failure re-opens it with a doubled timeout.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 3,
+                 reset_timeout: float = 30, max_reset_timeout: float = 15 * 60):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self._reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def allow(self) -> bool:
+        """Return True if a request may be attempted right now."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self._reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+                logger.info("Circuit %s half-open, probing", self.name)
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info("Circuit %s closed", self.name)
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+            self._reset_timeout = self.base_reset_timeout
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN:
+                self._reset_timeout = min(self._reset_timeout * 2, self.max_reset_timeout)
+            elif self._failures < self.failure_threshold:
+                return
+            self._state = self.OPEN
+            self._opened_at = time.monotonic()
+            self._probe_in_flight = False
+            logger.warning("Circuit %s open for %.0fs", self.name, self._reset_timeout)
+
+
+class NegativeCache:
+    """Remember keys whose fetch failed and refuse retries until a backoff expires."""
+
+    def __init__(self, base_delay: float = 30, max_delay: float = 30 * 60):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._entries: dict[str, tuple[int, float]] = {}
+        self._lock = threading.Lock()
+
+    def is_blocked(self, key: str) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and time.monotonic() < entry[1]
+
+    def record_failure(self, key: str) -> None:
+        with self._lock:
+            failures = self._entries.get(key, (0, 0.0))[0] + 1
+            delay = min(self.base_delay * 2 ** (failures - 1), self.max_delay)
+            self._entries[key] = (failures, time.monotonic() + delay)
+
+    def clear(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
@@ -2,6 +2,8 @@ import logging
 
 from apscheduler.schedulers.background import BackgroundScheduler
 
+from config import SCHEDULER_MISFIRE_GRACE, MIDNIGHT_WARMUP_MINUTES, PRESENCE_CHECK_INTERVAL
+
 logger = logging.getLogger(__name__)
 
 _scheduler: BackgroundScheduler | None = None
@@ -12,14 +14,25 @@ def get_scheduler() -> BackgroundScheduler | None:
     return _scheduler
 
 
-def start(refresh_wallpaper_fn, fetch_daily_fn) -> None:
-    """Start the background scheduler with two jobs.
+def start(refresh_wallpaper_fn, fetch_daily_fn, sched=None,
+          prepare_tomorrow_fn=None, rollover_fn=None, presence_fn=None) -> None:
+    """Start the background scheduler.
 
     - refresh_wallpaper_fn: called every 60 seconds
     - fetch_daily_fn: called once at midnight daily
+    - prepare_tomorrow_fn: called MIDNIGHT_WARMUP_MINUTES before midnight
+    - rollover_fn: called at midnight, to swap in what was prepared
+    - presence_fn: called every PRESENCE_CHECK_INTERVAL seconds (adaptive refresh)
+
+    sched replaces the APScheduler BackgroundScheduler with any object of the
+    same add_job/get_jobs/start/shutdown shape (e.g. simulation.SimScheduler).
+
+    Runs missed while the machine slept are coalesced into one and dropped
+    once more than SCHEDULER_MISFIRE_GRACE late; clock_monitor catches up
+    after longer gaps.
     """
     global _scheduler
-    _scheduler = BackgroundScheduler()
+    _scheduler = sched if sched is not None else BackgroundScheduler()
 
     _scheduler.add_job(
         refresh_wallpaper_fn,
@@ -27,6 +40,8 @@ def start(refresh_wallpaper_fn, fetch_daily_fn) -> None:
         seconds=60,
         id="refresh_wallpaper",
         replace_existing=True,
+        coalesce=True,
+        misfire_grace_time=SCHEDULER_MISFIRE_GRACE,
     )
 
     _scheduler.add_job(
@@ -36,8 +51,46 @@ def start(refresh_wallpaper_fn, fetch_daily_fn) -> None:
         minute=1,
         id="fetch_daily",
         replace_existing=True,
+        coalesce=True,
+        misfire_grace_time=SCHEDULER_MISFIRE_GRACE,
     )
 
+    if prepare_tomorrow_fn is not None:
+        warmup = 24 * 60 - MIDNIGHT_WARMUP_MINUTES
+        _scheduler.add_job(
+            prepare_tomorrow_fn,
+            "cron",
+            hour=warmup // 60,
+            minute=warmup % 60,
+            id="prepare_tomorrow",
+            replace_existing=True,
+            coalesce=True,
+            misfire_grace_time=SCHEDULER_MISFIRE_GRACE,
+        )
+
+    if rollover_fn is not None:
+        _scheduler.add_job(
+            rollover_fn,
+            "cron",
+            hour=0,
+            minute=0,
+            id="rollover",
+            replace_existing=True,
+            coalesce=True,
+            misfire_grace_time=SCHEDULER_MISFIRE_GRACE,
+        )
+
+    if presence_fn is not None:
+        _scheduler.add_job(
+            presence_fn,
+            "interval",
+            seconds=PRESENCE_CHECK_INTERVAL,
+            id="presence",
+            replace_existing=True,
+            coalesce=True,
+            misfire_grace_time=SCHEDULER_MISFIRE_GRACE,
+        )
+
     _scheduler.start()
     logger.info("Scheduler started")
 
@@ -0,0 +1,325 @@
+"""Headless HTTP server for prayer times and rendered wallpapers.
+
+Lets one machine serve many desks and kiosks instead of each one fetching
+and rendering on its own.
+
+    GET /times/{city}/{YYYY-MM-DD}    -> JSON timetable
+    GET /wallpaper/{city}?w=&h=       -> PNG wallpaper for the current minute
+    GET /stats                        -> frame cache hit ratio and evictions
+
+Only gazetteer places, the main cities and "lat,lon" pairs near a known
+place are served, at the sizes in ALLOWED_SIZES and for dates within
+SERVER_TIMES_MAX_DAYS of today, so clients can't make the server fetch or
+render arbitrary targets or grow its cache without limit. Coordinates are
+served as their nearest known place, so nearby "lat,lon" strings share one
+frame. Timetables are only served for the exact date asked for, never a
+fallback day.
+
+Both support ETag / If-None-Match. Rendered frames are kept in a bounded
+LRU cache, and the next minute's frames for recently requested
+(city, size) pairs are rendered just before the minute turns. Run with:
+
+    python server.py [--host 0.0.0.0] [--port 8080] [--cache-mb 256] [--spill]
+"""
+import argparse
+import asyncio
+import functools
+import hashlib
+import io
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import clock
+import gazetteer
+from api import prefetch_prayer_times
+from backgrounds import current_phase
+from config import (
+    CITIES, SERVER_HOST, SERVER_PORT, SERVER_TIMES_MAX_DAYS, FRAME_CACHE_BUDGET, FRAME_CACHE_DIR,
+)
+from frame_cache import FrameCache
+from logging_setup import setup_logging
+from main import get_countdown, get_next_prayer
+from settings_store import get_settings
+from wallpaper import generate_wallpaper, set_pool_sizes
+
+logger = logging.getLogger(__name__)
+
+# Wallpaper sizes served; each one costs a frame per city and minute
+ALLOWED_SIZES = frozenset({
+    (1280, 720), (1280, 800), (1366, 768), (1440, 900), (1536, 864), (1600, 900),
+    (1680, 1050), (1920, 1080), (1920, 1200), (2560, 1080), (2560, 1440),
+    (2560, 1600), (3440, 1440), (3840, 2160),
+    # Portrait kiosks and signage
+    (1080, 1920), (2160, 3840),
+})
+
+# Second of each minute at which the next minute's frames are pre-rendered
+WARM_AHEAD_SECOND = 55
+# Only warm (city, width, height) targets requested within this many seconds
+WARM_RECENT_SECONDS = 5 * 60
+
+_frames = FrameCache()
+_recent: dict[tuple[str, int, int], float] = {}
+_served_sizes = 0
+
+REASONS = {
+    200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found",
+    405: "Method Not Allowed", 500: "Internal Server Error", 503: "Service Unavailable",
+}
+
+
+class Response:
+    def __init__(self, status: int, body: bytes = b"", content_type: str = "text/plain",
+                 etag: str | None = None, max_age: int = 0):
+        self.status = status
+        self.body = body
+        self.content_type = content_type
+        self.etag = etag
+        self.max_age = max_age
+
+
+def _etag(*parts) -> str:
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode()).hexdigest()
+    return f'"{digest[:20]}"'
+
+
+def _error(status: int, message: str) -> Response:
+    return Response(status, message.encode())
+
+
+def _canonical(city: str) -> str | None:
+    """The name a location is served, cached and labelled as, or None if we don't serve it.
+
+    Checked before anything is fetched. Place names are matched
+    case-insensitively and coordinates become their nearest known place.
+    """
+    if city in CITIES:
+        return city
+    place = gazetteer.resolve(city)
+    if place is None:
+        return None
+    coords = gazetteer.parse_coordinates(city)
+    if coords is not None and place.name == city:
+        return gazetteer.get_gazetteer().nearest(*coords).name
+    return place.name
+
+
+async def _times(city: str, date_str: str) -> Response:
+    city = _canonical(city)
+    if city is None:
+        return _error(404, "Unknown location")
+    try:
+        day = datetime.strptime(date_str, "%Y-%m-%d")
+    except ValueError:
+        return _error(400, "Date must be YYYY-MM-DD")
+    if abs((day.date() - clock.now().date()).days) > SERVER_TIMES_MAX_DAYS:
+        return _error(400, f"Date must be within {SERVER_TIMES_MAX_DAYS} days of today")
+    loop = asyncio.get_running_loop()
+    # Never the previous day's fallback: the response is labelled and cached as date_str
+    times = await loop.run_in_executor(None, prefetch_prayer_times, day, city)
+    if times is None:
+        return _error(503, "Prayer times unavailable")
+    body = json.dumps({"city": city, "date": date_str, "times": times}).encode()
+    return Response(200, body, "application/json", _etag(body), max_age=3600)
+
+
+def _render_png(times: dict, next_name: str, countdown: str, city: str,
+                size: tuple[int, int], at: datetime, hijri_offset: int) -> bytes:
+    buf = io.BytesIO()
+    generate_wallpaper(times, next_name, countdown, CITIES.get(city, city),
+                       size=size, path=buf, hijri_offset=hijri_offset, at=at)
+    return buf.getvalue()
+
+
+def _frame(city: str, times: dict, at: datetime, size: tuple[int, int]):
+    """Return (cache_key, render_fn) for the frame showing minute `at`.
+
+    Frames are per minute: the countdown drops its seconds so every client in
+    the same minute gets the same image.
+    """
+    next_name, next_time = get_next_prayer(times, city, now=at)
+    countdown = get_countdown(next_time, now=at)[:5]
+    hijri_offset = get_settings().hijri_offset
+    key = (city, at.strftime("%Y-%m-%d"), next_name, countdown, size[0], size[1],
+           current_phase(times, at), hijri_offset, tuple(sorted(times.items())))
+    return key, functools.partial(
+        _render_png, times, next_name, countdown, city, size, at, hijri_offset,
+    )
+
+
+async def _wallpaper(city: str, query: dict, if_none_match: str | None) -> Response:
+    city = _canonical(city)
+    if city is None:
+        return _error(404, "Unknown location")
+    try:
+        width = int(query.get("w", ["1920"])[0])
+        height = int(query.get("h", ["1080"])[0])
+    except ValueError:
+        return _error(400, "w and h must be integers")
+    if (width, height) not in ALLOWED_SIZES:
+        sizes = ", ".join(f"{w}x{h}" for w, h in sorted(ALLOWED_SIZES))
+        return _error(400, f"Unsupported size; use one of {sizes}")
+
+    loop = asyncio.get_running_loop()
+    now = clock.now().replace(second=0, microsecond=0)
+    times = await loop.run_in_executor(None, prefetch_prayer_times, now, city)
+    if times is None:
+        return _error(503, "Prayer times unavailable")
+    target = (city, width, height)
+    is_new = target not in _recent
+    _recent[target] = time.monotonic()
+    if is_new:
+        await _size_pools()
+
+    key, render_fn = await loop.run_in_executor(None, _frame, city, times, now, (width, height))
+    # The ETag is derived from the frame key, so a revalidation is answered
+    # without rendering or even a cache lookup
+    etag = _etag(*key)
+    body = b""
+    if if_none_match != etag:
+        body = await loop.run_in_executor(None, _frames.get_or_render, key, render_fn)
+    return Response(200, body, "image/png", etag, max_age=60 - clock.now().second)
+
+
+async def _size_pools() -> None:
+    """Size wallpaper's canvas pool and background cache to the sizes recently served.
+
+    With fewer slots than sizes in rotation, each size would evict another's
+    canvas and background and every frame would redraw its background.
+    """
+    global _served_sizes
+    count = len({(width, height) for _, width, height in _recent})
+    if count != _served_sizes:
+        _served_sizes = count
+        await asyncio.get_running_loop().run_in_executor(None, set_pool_sizes, count)
+
+
+def _stats() -> Response:
+    body = json.dumps({"frame_cache": _frames.stats()}).encode()
+    return Response(200, body, "application/json")
+
+
+async def _warm_loop() -> None:
+    """Shortly before each minute, render the next minute's frames for recent clients."""
+    loop = asyncio.get_running_loop()
+    while True:
+        now = clock.now()
+        await asyncio.sleep((WARM_AHEAD_SECOND - now.second - now.microsecond / 1e6) % 60 or 60)
+        next_minute = clock.now().replace(second=0, microsecond=0) + timedelta(minutes=1)
+        cutoff = time.monotonic() - WARM_RECENT_SECONDS
+        for target, last_seen in list(_recent.items()):
+            if last_seen < cutoff:
+                _recent.pop(target, None)
+        await _size_pools()
+        for target in list(_recent):
+            city, width, height = target
+            try:
+                times = await loop.run_in_executor(None, prefetch_prayer_times, next_minute, city)
+                if times:
+                    key, render_fn = await loop.run_in_executor(
+                        None, _frame, city, times, next_minute, (width, height),
+                    )
+                    _frames.warm(key, render_fn)
+            except Exception:
+                logger.exception("Failed to warm frame for %s", target)
+
+
+async def route(method: str, target: str, if_none_match: str | None = None) -> Response:
+    if method not in ("GET", "HEAD"):
+        return _error(405, "Only GET is supported")
+
+    url = urlsplit(target)
+    parts = [unquote(p) for p in url.path.strip("/").split("/")]
+
+    if len(parts) == 3 and parts[0] == "times":
+        response = await _times(parts[1], parts[2])
+    elif len(parts) == 2 and parts[0] == "wallpaper":
+        response = await _wallpaper(parts[1], parse_qs(url.query), if_none_match)
+    elif parts == ["stats"]:
+        return _stats()
+    else:
+        return _error(404, "Not found")
+
+    if response.status == 200 and response.etag and if_none_match == response.etag:
+        return Response(304, b"", response.content_type, response.etag, response.max_age)
+    return response
+
+
+async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        while True:
+            try:
+                head = await reader.readuntil(b"\r\n\r\n")
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                break
+            lines = head.decode("latin-1").split("\r\n")
+            try:
+                method, target, version = lines[0].split(" ", 2)
+            except ValueError:
+                break
+            headers = {}
+            for line in lines[1:]:
+                name, sep, value = line.partition(":")
+                if sep:
+                    headers[name.strip().lower()] = value.strip()
+
+            try:
+                response = await route(method, target, headers.get("if-none-match"))
+            except Exception:
+                logger.exception("Error handling %s %s", method, target)
+                response = _error(500, "Internal error")
+
+            keep_alive = (version == "HTTP/1.1"
+                          and headers.get("connection", "").lower() != "close")
+            out = [
+                f"HTTP/1.1 {response.status} {REASONS.get(response.status, '')}",
+                f"Content-Type: {response.content_type}",
+                f"Content-Length: {len(response.body)}",
+                f"Connection: {'keep-alive' if keep_alive else 'close'}",
+            ]
+            if response.etag:
+                out.append(f"ETag: {response.etag}")
+                out.append(f"Cache-Control: max-age={response.max_age}")
+            writer.write(("\r\n".join(out) + "\r\n\r\n").encode("latin-1"))
+            if method != "HEAD":
+                writer.write(response.body)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host: str = SERVER_HOST, port: int = SERVER_PORT) -> None:
+    server = await asyncio.start_server(_handle, host, port)
+    warm_task = asyncio.create_task(_warm_loop())
+    logger.info("Serving on %s:%d", host, port)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        warm_task.cancel()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Waktu Solat HTTP server")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--cache-mb", type=int, default=FRAME_CACHE_BUDGET // 2**20,
+                        help="Memory budget for cached frames")
+    parser.add_argument("--spill", action="store_true",
+                        help="Spill evicted frames to cache/frames instead of dropping them")
+    args = parser.parse_args()
+
+    _frames = FrameCache(args.cache_mb * 2**20, FRAME_CACHE_DIR if args.spill else None)
+
+    setup_logging()
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,170 @@
+import json
+import logging
+import os
+import threading
+
+from config import SETTINGS_FILE, SETTINGS_SAVE_DELAY, DEFAULT_CITY, RECENT_CITIES_MAX
+from storage import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+# Every known setting with its default; the default's type is the setting's type
+DEFAULTS = {
+    "city": DEFAULT_CITY,
+    "notify_before_minutes": 10,
+    "render_format": "PNG",
+    "refresh_mode": "interval",
+    "hijri_offset": 0,
+    "profiling_enabled": False,
+    "render_worker": True,
+    "recent_cities": [],
+}
+
+
+class SettingsStore:
+    """User settings held in memory and persisted in the background.
+
+    The file is read once. set() only updates memory and (re)starts a
+    debounce timer, so a burst of changes results in a single write of the
+    final state. Writes are atomic (temp file, fsync, rename); call flush()
+    before exit to persist anything still pending.
+    """
+
+    def __init__(self, path: str = SETTINGS_FILE, save_delay: float = SETTINGS_SAVE_DELAY):
+        self._path = path
+        self._save_delay = save_delay
+        self._lock = threading.Lock()
+        self._timer: threading.Timer | None = None
+        self._dirty = False
+        self._data = self._load()
+
+    def _load(self) -> dict:
+        if os.path.exists(self._path):
+            try:
+                with open(self._path, "r") as f:
+                    data = json.load(f)
+                if isinstance(data, dict):
+                    return data
+            except (json.JSONDecodeError, IOError):
+                logger.warning("Failed to read settings file")
+        return {}
+
+    # --- Generic access ---
+
+    def get(self, key: str):
+        """Return the stored value, or the default if missing or of the wrong type."""
+        default = DEFAULTS.get(key)
+        value = self._data.get(key, default)
+        if default is not None and not isinstance(value, type(default)):
+            return default
+        # bool is an int subclass, so true would pass for an integer setting
+        if isinstance(value, bool) and not isinstance(default, bool):
+            return default
+        return value
+
+    def set(self, key: str, value) -> None:
+        with self._lock:
+            if self._data.get(key) == value:
+                return
+            self._data[key] = value
+            self._dirty = True
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self._save_delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self) -> None:
+        """Write pending changes to disk now."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty:
+                return
+            try:
+                atomic_write_json(self._path, self._data)
+                self._dirty = False
+            except OSError:
+                logger.error("Failed to save settings")
+
+    # --- Typed accessors ---
+
+    @property
+    def city(self) -> str:
+        return self.get("city")
+
+    @city.setter
+    def city(self, value: str) -> None:
+        self.set("city", value)
+
+    @property
+    def notify_before_minutes(self) -> int:
+        return self.get("notify_before_minutes")
+
+    @notify_before_minutes.setter
+    def notify_before_minutes(self, value: int) -> None:
+        self.set("notify_before_minutes", int(value))
+
+    @property
+    def render_format(self) -> str:
+        return self.get("render_format")
+
+    @render_format.setter
+    def render_format(self, value: str) -> None:
+        self.set("render_format", value)
+
+    @property
+    def refresh_mode(self) -> str:
+        return self.get("refresh_mode")
+
+    @refresh_mode.setter
+    def refresh_mode(self, value: str) -> None:
+        self.set("refresh_mode", value)
+
+    @property
+    def hijri_offset(self) -> int:
+        return self.get("hijri_offset")
+
+    @hijri_offset.setter
+    def hijri_offset(self, value: int) -> None:
+        self.set("hijri_offset", int(value))
+
+    @property
+    def profiling_enabled(self) -> bool:
+        return self.get("profiling_enabled")
+
+    @profiling_enabled.setter
+    def profiling_enabled(self, value: bool) -> None:
+        self.set("profiling_enabled", bool(value))
+
+    @property
+    def recent_cities(self) -> list[str]:
+        """Most recently chosen locations, newest first."""
+        return list(self.get("recent_cities"))
+
+    def remember_city(self, city: str) -> None:
+        """Move city to the front of recent_cities, keeping RECENT_CITIES_MAX."""
+        recent = [city] + [c for c in self.recent_cities if c != city]
+        self.set("recent_cities", recent[:RECENT_CITIES_MAX])
+
+    @property
+    def render_worker(self) -> bool:
+        return self.get("render_worker")
+
+    @render_worker.setter
+    def render_worker(self, value: bool) -> None:
+        self.set("render_worker", bool(value))
+
+
+_store: SettingsStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_settings() -> SettingsStore:
+    """Return the process-wide settings store, loading it on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SettingsStore()
+        return _store
@@ -0,0 +1,186 @@
+"""Publish raw RGB frames into a shared-memory ring buffer.
+
+Local consumers (overlays, signage players) map the latest frame directly
+instead of decoding a PNG from disk.
+
+Layout (little-endian):
+
+    header   magic "WSFRAME1", width u32, height u32, channels u32,
+             slots u32, latest sequence u64                  (HEADER_SIZE)
+    slot i   sequence u64, padding to SLOT_HEADER_SIZE, then
+             width * height * channels bytes of RGB
+
+The writer fills slot ``seq % slots``, stamps the slot with ``seq`` and only
+then publishes ``seq`` in the header. A reader takes the header sequence,
+checks the slot carries the same one, and re-checks after using the frame:
+if it changed, the writer lapped the ring and the frame must be discarded.
+"""
+import logging
+import struct
+import sys
+from multiprocessing import shared_memory
+
+from config import SHM_FRAME_NAME, SHM_FRAME_SLOTS
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"WSFRAME1"
+_HEADER = struct.Struct("<8sIIIIQ")
+HEADER_SIZE = 64
+SLOT_HEADER_SIZE = 64
+_SEQ = struct.Struct("<Q")
+_SEQ_OFFSET = _HEADER.size - _SEQ.size
+
+# Segments created by sinks in this process and not yet unlinked
+_own_segments: set[str] = set()
+
+
+def _frame_size(width: int, height: int, channels: int = 3) -> int:
+    return width * height * channels
+
+
+def _slot_offset(index: int, frame_size: int) -> int:
+    return HEADER_SIZE + index * (SLOT_HEADER_SIZE + frame_size)
+
+
+class SharedFrameSink:
+    """Writer side of the ring buffer. One per (name, resolution)."""
+
+    def __init__(self, size: tuple[int, int], name: str = SHM_FRAME_NAME,
+                 slots: int = SHM_FRAME_SLOTS):
+        self.width, self.height = size
+        self.slots = slots
+        self.frame_size = _frame_size(self.width, self.height)
+        total = _slot_offset(slots, self.frame_size)
+        try:
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=total)
+        except FileExistsError:
+            # Left over from a previous run; replace it if the layout differs
+            old = shared_memory.SharedMemory(name=name)
+            if old.size >= total:
+                self._shm = old
+            else:
+                old.close()
+                old.unlink()
+                self._shm = shared_memory.SharedMemory(name=name, create=True, size=total)
+        self.name = self._shm.name
+        _own_segments.add(self.name)
+        self.seq = 0
+        _HEADER.pack_into(self._shm.buf, 0, MAGIC, self.width, self.height, 3, slots, 0)
+
+    def publish(self, image) -> int:
+        """Copy an RGB PIL image (or raw RGB bytes) into the next slot and publish it."""
+        data = image.tobytes() if hasattr(image, "tobytes") else image
+        if len(data) != self.frame_size:
+            raise ValueError(f"Frame is {len(data)} bytes, expected {self.frame_size}")
+        seq = self.seq + 1
+        offset = _slot_offset(seq % self.slots, self.frame_size)
+        buf = self._shm.buf
+        _SEQ.pack_into(buf, offset, 0)  # Mark slot as being written
+        buf[offset + SLOT_HEADER_SIZE:offset + SLOT_HEADER_SIZE + self.frame_size] = data
+        _SEQ.pack_into(buf, offset, seq)
+        _SEQ.pack_into(buf, _SEQ_OFFSET, seq)
+        self.seq = seq
+        return seq
+
+    def close(self, unlink: bool = True) -> None:
+        self._shm.close()
+        if unlink:
+            _own_segments.discard(self.name)
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class SharedFrameReader:
+    """Reference reader: map the latest frame without copying it."""
+
+    def __init__(self, name: str = SHM_FRAME_NAME):
+        self._shm = shared_memory.SharedMemory(name=name)
+        if sys.platform != "win32" and self._shm.name not in _own_segments:
+            # Readers must not unlink the writer's segment when they exit;
+            # in the writer's own process the sink's unlink accounts for it
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(self._shm._name, "shared_memory")
+        magic, self.width, self.height, self.channels, self.slots, _ = \
+            _HEADER.unpack_from(self._shm.buf, 0)
+        if magic != MAGIC:
+            self._shm.close()
+            raise ValueError(f"{name} is not a frame ring buffer")
+        self.frame_size = _frame_size(self.width, self.height, self.channels)
+
+    def latest_seq(self) -> int:
+        return _SEQ.unpack_from(self._shm.buf, _SEQ_OFFSET)[0]
+
+    def latest(self) -> tuple[int, memoryview] | None:
+        """Return (seq, view of the frame bytes) for the newest frame, or None.
+
+        The view aliases shared memory: use it, then call is_current(seq)
+        to confirm it was not overwritten meanwhile.
+        """
+        seq = self.latest_seq()
+        if seq == 0:
+            return None
+        offset = _slot_offset(seq % self.slots, self.frame_size)
+        if _SEQ.unpack_from(self._shm.buf, offset)[0] != seq:
+            return None
+        start = offset + SLOT_HEADER_SIZE
+        return seq, self._shm.buf[start:start + self.frame_size]
+
+    def is_current(self, seq: int) -> bool:
+        """True if the slot holding seq has not been reused since it was read."""
+        offset = _slot_offset(seq % self.slots, self.frame_size)
+        return _SEQ.unpack_from(self._shm.buf, offset)[0] == seq
+
+    def latest_array(self):
+        """Return (seq, numpy (h, w, 3) uint8 view) of the newest frame, or None."""
+        import numpy as np
+
+        result = self.latest()
+        if result is None:
+            return None
+        seq, view = result
+        frame = np.frombuffer(view, dtype=np.uint8).reshape(self.height, self.width, self.channels)
+        return seq, frame
+
+    def close(self) -> None:
+        self._shm.close()
+
+
+_sinks: dict[tuple[int, int], SharedFrameSink] = {}
+
+
+def get_sink(size: tuple[int, int]) -> SharedFrameSink:
+    """Return the process-wide sink for size, replacing one of another size."""
+    sink = _sinks.get(size)
+    if sink is None:
+        for old in _sinks.values():
+            old.close()
+        _sinks.clear()
+        sink = _sinks[size] = SharedFrameSink(size)
+    return sink
+
+
+def close_sinks() -> None:
+    for sink in _sinks.values():
+        sink.close()
+    _sinks.clear()
+
+
+if __name__ == "__main__":
+    import time
+
+    reader = SharedFrameReader()
+    print(f"Attached to {SHM_FRAME_NAME}: {reader.width}x{reader.height}, {reader.slots} slots")
+    last = 0
+    while True:
+        result = reader.latest()
+        if result and result[0] != last:
+            seq, view = result
+            checksum = sum(view[::4096])
+            if reader.is_current(seq):
+                print(f"frame {seq}: {len(view)} bytes, sample checksum {checksum}")
+            last = seq
+            view.release()
+        time.sleep(0.5)
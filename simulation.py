@@ -0,0 +1,386 @@
+"""Replay days or years of app behaviour on a simulated clock, headless.
+
+Drives main's scheduler jobs (wallpaper refresh, daily fetch, prayer
+notifications) and the tray tooltip through an accelerated timeline with a
+synthetic prayer-times provider, then reports how many fetches, renders and
+wakeups happened and how much work each kind of event cost.
+
+With --sleep the machine is suspended every night: the clock jumps over the
+window without running jobs, the scheduler applies APScheduler's coalescing
+and misfire rules to what was missed, and clock_monitor's catch-up runs on
+resume. The report shows whether today's times were on display afterwards.
+
+With --away the "adaptive" refresh mode is on and the session is locked
+every day for the given window, using presence's fake provider; the report
+shows how many renders it skipped and the CPU time that saved. Frames are
+then really rendered (as with --render), since the saving is valued at the
+measured cost of a render.
+
+    python simulation.py --days 365 [--start 2026-01-01] [--tooltip-interval 1] [--render]
+                         [--sleep 23:30-07:00] [--away 18:00-09:00]
+"""
+import argparse
+import heapq
+import itertools
+import math
+import os
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, time as dtime, timedelta
+
+import api
+import app_state
+import clock
+import clock_monitor
+import main as app
+import notifications
+import presence
+import providers
+import render_worker
+import scheduler
+import wallpaper
+from config import DEFAULT_CITY
+
+
+class SimJob:
+    """The subset of an APScheduler Job that the app uses."""
+
+    def __init__(self, sched: "SimScheduler", job_id: str, func, args, trigger: str,
+                 coalesce: bool = True, misfire_grace_time: float | None = 1, **trigger_args):
+        self._sched = sched
+        self.id = job_id
+        self.func = func
+        self.args = args or []
+        self.trigger = trigger
+        self.trigger_args = trigger_args
+        self.coalesce = coalesce
+        self.misfire_grace_time = misfire_grace_time
+        self.removed = False
+
+    def remove(self) -> None:
+        self._sched.remove_job(self.id)
+
+    def next_run_after(self, after: datetime) -> datetime | None:
+        if self.trigger == "interval":
+            return after + timedelta(seconds=self.trigger_args["seconds"])
+        if self.trigger == "cron":
+            candidate = after.replace(
+                hour=self.trigger_args.get("hour", 0),
+                minute=self.trigger_args.get("minute", 0),
+                second=0, microsecond=0,
+            )
+            return candidate if candidate > after else candidate + timedelta(days=1)
+        return None
+
+
+class SimScheduler:
+    """An APScheduler stand-in that runs jobs in simulated time, on the caller's thread.
+
+    Supports the "interval" (seconds), "cron" (hour, minute) and "date"
+    (run_date) triggers used by the app, and APScheduler's coalesce and
+    misfire_grace_time (defaults True and 1 second) for runs that are
+    overdue after suspend().
+    """
+
+    def __init__(self, sim_clock: clock.SimulatedClock):
+        self.clock = sim_clock
+        self.running = False
+        self._jobs: dict[str, SimJob] = {}
+        self._queue: list = []
+        self._seq = itertools.count()
+        self.misfires = 0
+
+    def add_job(self, func, trigger: str, args=None, id=None, replace_existing=False,
+                run_date=None, coalesce=True, misfire_grace_time=1, **kwargs) -> SimJob:
+        job_id = id or f"job_{next(self._seq)}"
+        if job_id in self._jobs:
+            if not replace_existing:
+                raise ValueError(f"Job {job_id} already exists")
+            self.remove_job(job_id)
+        trigger_args = {k: kwargs[k] for k in ("seconds", "hour", "minute") if k in kwargs}
+        job = SimJob(self, job_id, func, args, trigger, coalesce, misfire_grace_time,
+                     **trigger_args)
+        first = run_date if trigger == "date" else job.next_run_after(self.clock.now())
+        self._jobs[job_id] = job
+        heapq.heappush(self._queue, (first, next(self._seq), job))
+        return job
+
+    def get_jobs(self) -> list[SimJob]:
+        return list(self._jobs.values())
+
+    def remove_job(self, job_id: str) -> None:
+        job = self._jobs.pop(job_id, None)
+        if job:
+            job.removed = True
+
+    def start(self) -> None:
+        self.running = True
+
+    def shutdown(self, wait: bool = True) -> None:
+        self.running = False
+
+    def suspend(self, until: datetime) -> None:
+        """Jump the clock to until without running anything, like a sleeping machine."""
+        self.clock.set(until)
+
+    def _run_job(self, job: SimJob, on_event) -> None:
+        start = time.perf_counter()
+        job.func(*job.args)
+        on_event(job, time.perf_counter() - start)
+
+    def run_until(self, end: datetime, on_event) -> None:
+        """Run every job due before end in time order; on_event(job, seconds) after each."""
+        while self._queue and self._queue[0][0] < end:
+            run_at, _, job = heapq.heappop(self._queue)
+            if job.removed:
+                continue
+            now = self.clock.now()
+            if run_at >= now:
+                self.clock.set(run_at)
+                self._run_job(job, on_event)
+                next_run = job.next_run_after(run_at)
+            else:
+                # Overdue after a suspend: collect every missed run time
+                missed = [run_at]
+                next_run = job.next_run_after(run_at)
+                while next_run is not None and next_run <= now:
+                    missed.append(next_run)
+                    next_run = job.next_run_after(next_run)
+                if job.coalesce:
+                    missed = missed[-1:]
+                for run_time in missed:
+                    late = (now - run_time).total_seconds()
+                    if job.misfire_grace_time is not None and late > job.misfire_grace_time:
+                        self.misfires += 1
+                    elif not job.removed:
+                        self._run_job(job, on_event)
+            if next_run is None:
+                if self._jobs.get(job.id) is job:
+                    del self._jobs[job.id]
+            elif not job.removed:
+                heapq.heappush(self._queue, (next_run, next(self._seq), job))
+        if end > self.clock.now():
+            self.clock.set(end)
+
+
+class SimProvider(providers.Provider):
+    """Synthetic prayer times that drift with the season, with no network."""
+
+    name = "simulated"
+    BASE = {"Fajr": 345, "Sunrise": 425, "Dhuhr": 787, "Asr": 989, "Maghrib": 1150, "Isha": 1222}
+
+    def __init__(self):
+        super().__init__("sim://provider")
+        self.calls = 0
+
+    def fetch(self, day: datetime, city: str) -> dict:
+        self.calls += 1
+        return self.times_for(day)
+
+    def times_for(self, day: datetime) -> dict:
+        drift = 12 * math.sin(2 * math.pi * day.timetuple().tm_yday / 365.25)
+        return {
+            name: f"{int(m + drift) // 60:02d}:{int(m + drift) % 60:02d}"
+            for name, m in self.BASE.items()
+        }
+
+
+def _event_kind(job: SimJob) -> str:
+    if job.id.startswith(notifications.NOTIFICATION_JOB_PREFIX):
+        return "notification"
+    return job.id
+
+
+def _sleep_windows(start: datetime, end: datetime, sleep: tuple[dtime, dtime]):
+    """Yield (suspend_at, resume_at) for each nightly sleep inside [start, end]."""
+    day = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    while day < end:
+        suspend_at = datetime.combine(day.date(), sleep[0])
+        resume_at = datetime.combine(day.date(), sleep[1])
+        if resume_at <= suspend_at:
+            resume_at += timedelta(days=1)
+        if suspend_at >= start and resume_at <= end:
+            yield suspend_at, resume_at
+        day += timedelta(days=1)
+
+
+def run(start: datetime, days: float, city: str = DEFAULT_CITY,
+        tooltip_interval: float = 60, render: bool = False,
+        render_size: tuple[int, int] = (480, 270),
+        sleep: tuple[dtime, dtime] | None = None,
+        away: tuple[dtime, dtime] | None = None) -> dict:
+    """Simulate the app from start for the given number of days and return stats.
+
+    sleep is a nightly (suspend, resume) time-of-day window; away is a daily
+    (lock, unlock) window that turns on adaptive refresh, and implies render
+    so that skipped renders are valued at a real render's cost.
+    """
+    render = render or away is not None
+    stats = {"events": defaultdict(lambda: [0, 0.0]), "renders": 0,
+             "wallpaper_sets": 0, "notifications": 0,
+             "resumes": 0, "catch_ups": 0, "current_after_resume": 0}
+    workdir = tempfile.mkdtemp(prefix="waktusolat_sim_")
+    render_path = os.path.join(workdir, "wallpaper.png")
+
+    real_generate = wallpaper.generate_wallpaper
+    saved = {
+        (wallpaper, "generate_wallpaper"): wallpaper.generate_wallpaper,
+        (wallpaper, "set_wallpaper"): wallpaper.set_wallpaper,
+        (render_worker, "render"): render_worker.render,
+        (notifications, "show_notification"): notifications.show_notification,
+        (api, "CACHE_FILE"): api.CACHE_FILE,
+        (api, "_cache"): api._cache,
+        (api, "_refresh_in_background"): api._refresh_in_background,
+        (api, "_refresh_listeners"): api._refresh_listeners,
+        (app, "_refresh_policy"): app._refresh_policy,
+    }
+    saved_providers = providers.get_providers()
+    saved_clock = clock.get_clock()
+
+    def _generate(prayer_times, next_prayer, countdown, city_display="", **kwargs):
+        stats["renders"] += 1
+        if render:
+            real_generate(prayer_times, next_prayer, countdown, city_display,
+                          size=render_size, path=render_path)
+
+    def _render_in_worker(prayer_times, next_prayer, countdown, city_display="", **kwargs):
+        _generate(prayer_times, next_prayer, countdown, city_display)
+        return True
+
+    def _set(path=None):
+        stats["wallpaper_sets"] += 1
+
+    def _notify(prayer_name, minutes_until=0):
+        stats["notifications"] += 1
+
+    def _refresh_inline(date, location, cache_key):
+        api._refresh_worker(date, location, cache_key)
+
+    def _catch_up(before, after):
+        stats["catch_ups"] += 1
+        app.catch_up(before, after)
+
+    def _on_event(job, seconds):
+        entry = stats["events"][_event_kind(job)]
+        entry[0] += 1
+        entry[1] += seconds
+
+    sim_clock = clock.SimulatedClock(start)
+    sim_provider = SimProvider()
+    sched = SimScheduler(sim_clock)
+    try:
+        clock.set_clock(sim_clock)
+        providers.set_providers([sim_provider])
+        wallpaper.generate_wallpaper = _generate
+        wallpaper.set_wallpaper = _set
+        render_worker.render = _render_in_worker
+        notifications.show_notification = _notify
+        api.CACHE_FILE = os.path.join(workdir, "prayer_times.json")
+        api._cache = {}
+        api._refresh_in_background = _refresh_inline
+        api._refresh_listeners = [app._on_times_refreshed]
+        app._requested_city = city
+        app_state.reset(city)
+        app._refresh_policy = None
+        if away is not None:
+            session = presence.FakePresenceProvider()
+            app._refresh_policy = presence.AdaptiveRefresh(session)
+
+        wall_start = time.perf_counter()
+        scheduler.start(app.refresh_tick, app.fetch_daily, sched=sched,
+                        prepare_tomorrow_fn=app.prepare_tomorrow, rollover_fn=app.rollover)
+        sched.add_job(app.get_tray_info, "interval", seconds=tooltip_interval, id="tray_tooltip")
+        if away is not None:
+            # Polling presence every few seconds would dominate the run, so
+            # the unlock itself triggers the check the app would make
+            def _unlock():
+                session.set(locked=False)
+                app.check_presence()
+
+            sched.add_job(lambda: session.set(locked=True), "cron", id="lock",
+                          hour=away[0].hour, minute=away[0].minute)
+            sched.add_job(_unlock, "cron", id="unlock",
+                          hour=away[1].hour, minute=away[1].minute)
+        app.fetch_daily()
+        app.refresh_wallpaper()
+        end = start + timedelta(days=days)
+        if sleep is not None:
+            monitor = clock_monitor.ClockJumpMonitor(_catch_up)
+            monitor.check()
+            sched.add_job(monitor.check, "interval", seconds=monitor.interval,
+                          id="clock_monitor", coalesce=True, misfire_grace_time=None)
+            for suspend_at, resume_at in _sleep_windows(start, end, sleep):
+                sched.run_until(suspend_at, _on_event)
+                sched.suspend(resume_at)
+                stats["resumes"] += 1
+                # Give the monitor one check interval to notice and catch up
+                sched.run_until(resume_at + timedelta(seconds=monitor.interval + 1), _on_event)
+                shown = app_state.current().prayer_times
+                if shown is not None and dict(shown) == sim_provider.times_for(sim_clock.now()):
+                    stats["current_after_resume"] += 1
+        sched.run_until(end, _on_event)
+        stats["wall_seconds"] = time.perf_counter() - wall_start
+        stats["misfires"] = sched.misfires
+        if app._refresh_policy is not None:
+            stats["adaptive"] = app._refresh_policy.report()
+    finally:
+        scheduler.stop()
+        for (module, name), value in saved.items():
+            setattr(module, name, value)
+        providers.set_providers(saved_providers)
+        clock.set_clock(saved_clock)
+
+    stats["fetches"] = sim_provider.calls
+    stats["wakeups"] = sum(count for count, _ in stats["events"].values())
+    stats["events"] = dict(stats["events"])
+    return stats
+
+
+def _report(stats: dict, days: float) -> None:
+    print(f"Simulated {days:g} days in {stats['wall_seconds']:.1f}s wall time")
+    print(f"  wakeups:        {stats['wakeups']}")
+    print(f"  fetches:        {stats['fetches']}")
+    print(f"  renders:        {stats['renders']}")
+    print(f"  wallpaper sets: {stats['wallpaper_sets']}")
+    print(f"  notifications:  {stats['notifications']}")
+    if stats["resumes"]:
+        print(f"  resumes:        {stats['resumes']} ({stats['catch_ups']} catch-ups, "
+              f"{stats['misfires']} missed runs skipped)")
+        print(f"  today's times shown after resume: "
+              f"{stats['current_after_resume']}/{stats['resumes']}")
+    if "adaptive" in stats:
+        adaptive = stats["adaptive"]
+        print(f"  adaptive refresh: {adaptive['skipped'] / days:.0f} renders/day skipped, "
+              f"~{adaptive['cpu_seconds_saved'] / days:.2f} CPU-s/day saved "
+              f"({adaptive['cpu_per_render'] * 1000:.1f} ms per render)")
+    print(f"\n  {'event':<20}{'count':>10}{'total s':>10}{'us/event':>10}{'per day':>10}")
+    for kind, (count, seconds) in sorted(stats["events"].items()):
+        print(f"  {kind:<20}{count:>10}{seconds:>10.2f}"
+              f"{seconds / count * 1e6:>10.1f}{count / days:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=float, default=365)
+    parser.add_argument("--start", default=None, help="YYYY-MM-DD (default: today)")
+    parser.add_argument("--city", default=DEFAULT_CITY)
+    parser.add_argument("--tooltip-interval", type=float, default=60,
+                        help="Simulated seconds between tray tooltip updates (the app uses 1)")
+    parser.add_argument("--render", action="store_true", help="Actually render frames (implied by --away)")
+    parser.add_argument("--sleep", default=None,
+                        help="Suspend nightly between HH:MM-HH:MM (e.g. 23:30-07:00)")
+    parser.add_argument("--away", default=None,
+                        help="Adaptive refresh, session locked daily HH:MM-HH:MM (e.g. 18:00-09:00)")
+    args = parser.parse_args()
+
+    start_day = (datetime.fromisoformat(args.start) if args.start
+                 else datetime.now().replace(hour=0, minute=0, second=0, microsecond=0))
+    sleep_window = None
+    if args.sleep:
+        sleep_window = tuple(dtime.fromisoformat(t) for t in args.sleep.split("-"))
+    away_window = None
+    if args.away:
+        away_window = tuple(dtime.fromisoformat(t) for t in args.away.split("-"))
+    _report(run(start_day, args.days, args.city, args.tooltip_interval, args.render,
+                sleep=sleep_window, away=away_window), args.days)
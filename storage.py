@@ -0,0 +1,27 @@
+import json
+import os
+import tempfile
+
+
+def atomic_write_json(path: str, data) -> None:
+    """Write JSON to path via temp file, fsync and rename.
+
+    Readers never see a partially written file; a crash mid-write leaves the
+    previous version in place. Raises OSError on failure.
+    """
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(
+        prefix=os.path.basename(path) + ".", suffix=".tmp", dir=directory,
+    )
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -4,11 +4,16 @@ import time
 import pystray
 from PIL import Image, ImageDraw
 
-from config import CITIES
+from config import CITIES, PROFILE_WINDOW_SECONDS
+import gazetteer
+import profiling
 import updater
 
 logger = logging.getLogger(__name__)
 
+# Zone descriptions longer than this are cut short in the menu
+MENU_LABEL_MAX = 48
+
 
 def _create_crescent_icon(size: int = 64) -> Image.Image:
     """Generate a simple gold crescent moon icon."""
@@ -26,7 +31,102 @@ def _create_crescent_icon(size: int = 64) -> Image.Image:
     return img
 
 
-def create_tray(get_next_prayer_fn, on_refresh, on_exit, on_city_change, get_current_city_fn):
+class _CurrentLocation:
+    """The current city with its zone and state, looked up again only when the city changes.
+
+    Menu check marks and labels are evaluated for every visible item each
+    time the menu is drawn; this keeps each of those to a comparison.
+    """
+
+    def __init__(self, get_current_city_fn):
+        self._get_city = get_current_city_fn
+        self._city = None
+        self._zone = None
+        self._state = None
+
+    def get(self) -> tuple[str, str | None, str | None]:
+        """Return (city, zone code, state name)."""
+        city = self._get_city()
+        if city != self._city:
+            zone = gazetteer.zone_for(city)
+            info = gazetteer.get_gazetteer().zones.get(zone) if zone else None
+            self._city, self._zone, self._state = city, zone, info.state if info else None
+        return self._city, self._zone, self._state
+
+
+def _short(text: str) -> str:
+    return text if len(text) <= MENU_LABEL_MAX else text[:MENU_LABEL_MAX - 1] + "\u2026"
+
+
+def _location_menu(select, current: _CurrentLocation, get_recent_cities_fn) -> pystray.Menu:
+    """Recent locations, the main cities, then every place by state and zone.
+
+    pystray's Windows backend expands every submenu into the native menu
+    whenever the menu is updated (at startup and after each click), so the
+    state and zone submenus are built once on the first update and their
+    items reused after that; only the short recent section is rebuilt. The
+    state and zone holding the current city are marked with a bullet.
+    """
+    def _is_current(city_key):
+        return lambda item: current.get()[0] == city_key
+
+    def _city_item(city_key, text=None):
+        return pystray.MenuItem(
+            text or CITIES.get(city_key, city_key), select(city_key),
+            checked=_is_current(city_key), radio=True,
+        )
+
+    def _marked(text, index, value):
+        return lambda item: f"\u2022 {text}" if current.get()[index] == value else text
+
+    def _lazy(build):
+        built = []
+
+        def _items():
+            if not built:
+                built.append(tuple(build()))
+            return built[0]
+        return _items
+
+    def _zone_places(code):
+        places = [p for p in gaz.places if p.zone == code]
+        return [_city_item(p.name) for p in sorted(places, key=lambda p: p.name)]
+
+    def _state_zones(state):
+        return [
+            pystray.MenuItem(
+                _marked(_short(f"{z.code} {z.description}"), 1, z.code),
+                pystray.Menu(_lazy(lambda code=z.code: _zone_places(code))),
+            )
+            for z in gaz.zones.values() if z.state == state
+        ]
+
+    gaz = gazetteer.get_gazetteer()
+    states = sorted({z.state for z in gaz.zones.values()})
+    fixed = (
+        pystray.MenuItem("Main Cities", pystray.Menu(*[_city_item(c) for c in CITIES])),
+        pystray.Menu.SEPARATOR,
+        *[
+            pystray.MenuItem(
+                _marked(state, 2, state),
+                pystray.Menu(_lazy(lambda state=state: _state_zones(state))),
+            )
+            for state in states
+        ],
+    )
+
+    def _items():
+        recent = get_recent_cities_fn() if get_recent_cities_fn else []
+        city = current.get()[0]
+        if city not in recent:
+            recent = [city, *recent]
+        return (*[_city_item(c) for c in recent], pystray.Menu.SEPARATOR, *fixed)
+
+    return pystray.Menu(_items)
+
+
+def create_tray(get_next_prayer_fn, on_refresh, on_exit, on_city_change, get_current_city_fn,
+                get_recent_cities_fn=None):
     """Create and run the system tray icon.
 
     Args:
@@ -35,6 +135,7 @@ def create_tray(get_next_prayer_fn, on_refresh, on_exit, on_city_change, get_cur
         on_exit: Callable to trigger clean app shutdown.
         on_city_change: Callable(city_key) to switch city.
         get_current_city_fn: Callable returning current city key string.
+        get_recent_cities_fn: Optional callable returning recently chosen city keys.
 
     This function blocks (runs the tray message loop).
     """
@@ -49,9 +150,12 @@ def create_tray(get_next_prayer_fn, on_refresh, on_exit, on_city_change, get_cur
         on_refresh()
 
     def _check_update(icon, item):
-        has_update, version = updater.check_for_updates()
+        has_update, version = updater.check_for_updates(force=True)
         if has_update:
             updater.show_update_notification(version)
+        elif updater.get_retry_at():
+            # Nothing was checked, so "no updates" would be a guess
+            updater.show_backoff_notification(updater.get_retry_at())
         else:
             updater.show_no_update_notification()
 
@@ -69,36 +173,32 @@ def create_tray(get_next_prayer_fn, on_refresh, on_exit, on_city_change, get_cur
         has_update, _ = updater.get_update_state()
         return has_update
 
+    def _toggle_profiling(icon, item):
+        profiling.toggle()
+
+    def _is_profiling(item):
+        return profiling.is_active()
+
     def _make_city_callback(city_key):
         def _cb(icon, item):
             on_city_change(city_key)
         return _cb
 
-    def _is_current_city(city_key):
-        def _check(item):
-            return get_current_city_fn() == city_key
-        return _check
-
-    # Build city submenu items
-    city_items = []
-    for city_key, display_name in CITIES.items():
-        city_items.append(
-            pystray.MenuItem(
-                display_name,
-                _make_city_callback(city_key),
-                checked=_is_current_city(city_key),
-                radio=True,
-            )
-        )
+    current = _CurrentLocation(get_current_city_fn)
 
     menu = pystray.Menu(
-        pystray.MenuItem("City", pystray.Menu(*city_items)),
+        pystray.MenuItem(
+            "City", _location_menu(_make_city_callback, current, get_recent_cities_fn),
+        ),
         pystray.Menu.SEPARATOR,
         pystray.MenuItem(_get_update_text, None, enabled=False),
         pystray.MenuItem("Check for Updates", _check_update),
         pystray.MenuItem("Update Now", _do_update, visible=_is_update_available),
         pystray.Menu.SEPARATOR,
         pystray.MenuItem("Refresh Now", _refresh),
+        pystray.MenuItem(
+            f"Profile ({PROFILE_WINDOW_SECONDS}s)", _toggle_profiling, checked=_is_profiling,
+        ),
         pystray.MenuItem("Exit", _quit),
     )
 
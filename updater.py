@@ -1,24 +1,29 @@
+import json
 import logging
 import os
 import sys
 import tempfile
+import time
 import zipfile
 from typing import Optional
 
 import requests
 from winotify import Notification, audio
 
-from config import APP_VERSION, GITHUB_REPO, BASE_DIR
+from config import (
+    APP_VERSION, BASE_DIR, GITHUB_API_URL, UPDATE_CACHE_FILE,
+    UPDATE_CHECK_INTERVAL, UPDATE_MANUAL_CHECK_INTERVAL, UPDATE_MAX_BACKOFF,
+)
 
 logger = logging.getLogger(__name__)
 
-# GitHub API endpoint
-GITHUB_API_URL = f"https://api.github.com/repos/{GITHUB_REPO}/releases/latest"
-
 # Update state
 _update_available: bool = False
 _latest_version: str = ""
 _download_url: str = ""
+# When the last check couldn't ask GitHub (backoff or failure), the epoch
+# time before which it won't be asked again; 0 after a real check
+_retry_at: float = 0
 
 
 def get_update_state() -> tuple[bool, str]:
@@ -26,6 +31,11 @@ def get_update_state() -> tuple[bool, str]:
     return _update_available, _latest_version
 
 
+def get_retry_at() -> float:
+    """Return when checking resumes if the last check was backed off, else 0."""
+    return _retry_at
+
+
 def _parse_version(version_str: str) -> tuple[int, ...]:
     """Parse version string like 'v1.2.3' or '1.2.3' into tuple of ints."""
     v = version_str.lstrip("v")
@@ -40,52 +50,163 @@ def _is_newer_version(latest: str, current: str) -> bool:
     return _parse_version(latest) > _parse_version(current)
 
 
-def check_for_updates() -> tuple[bool, str]:
+def _load_release_cache() -> dict:
+    if os.path.exists(UPDATE_CACHE_FILE):
+        try:
+            with open(UPDATE_CACHE_FILE, "r") as f:
+                return json.load(f)
+        except (json.JSONDecodeError, IOError):
+            logger.warning("Failed to read release cache file")
+    return {}
+
+
+def _save_release_cache(cache: dict) -> None:
+    try:
+        with open(UPDATE_CACHE_FILE, "w") as f:
+            json.dump(cache, f, indent=2)
+    except IOError:
+        logger.error("Failed to write release cache file")
+
+
+def _apply_release(data: dict) -> tuple[bool, str]:
+    """Update module state from a GitHub release JSON payload."""
+    global _update_available, _latest_version, _download_url
+
+    _latest_version = data.get("tag_name", "")
+    _download_url = ""
+
+    # Find the Windows ZIP asset
+    assets = data.get("assets", [])
+    for asset in assets:
+        name = asset.get("name", "")
+        if name.endswith(".zip") and "win" in name.lower():
+            _download_url = asset.get("browser_download_url", "")
+            break
+
+    if not _download_url and assets:
+        # Fallback: use first ZIP asset
+        for asset in assets:
+            if asset.get("name", "").endswith(".zip"):
+                _download_url = asset.get("browser_download_url", "")
+                break
+
+    _update_available = _is_newer_version(_latest_version, APP_VERSION)
+    return _update_available, _latest_version
+
+
+def _cached_result(cache: dict) -> tuple[bool, str]:
+    release = cache.get("release")
+    if release:
+        return _apply_release(release)
+    return False, ""
+
+
+def _rate_limit_retry_at(response, now: float) -> float:
+    """Return the epoch time before which GitHub asked us not to call again, or 0."""
+    headers = response.headers
+    retry_after = headers.get("Retry-After")
+    if retry_after:
+        try:
+            return now + int(retry_after)
+        except ValueError:
+            pass
+    if headers.get("X-RateLimit-Remaining") == "0":
+        try:
+            return float(headers.get("X-RateLimit-Reset", ""))
+        except ValueError:
+            pass
+    return 0
+
+
+def _backoff(cache: dict, now: float, retry_at: float = 0) -> None:
+    """Record a failed check and push the next allowed check into the future."""
+    failures = cache.get("failures", 0) + 1
+    delay = min(60 * 2 ** failures, UPDATE_MAX_BACKOFF)
+    cache["failures"] = failures
+    cache["retry_at"] = min(max(retry_at, now + delay), now + UPDATE_MAX_BACKOFF)
+    _save_release_cache(cache)
+
+
+def check_for_updates(force: bool = False) -> tuple[bool, str]:
     """Check GitHub for new releases.
 
+    The last release payload is persisted together with its ETag and
+    Last-Modified headers, so repeat checks are conditional requests and a
+    304 answer does not count against GitHub's rate limit. Checks within
+    UPDATE_CHECK_INTERVAL (or UPDATE_MANUAL_CHECK_INTERVAL when ``force`` is
+    set) and checks during a rate-limit or failure backoff are answered from
+    the cache without any request. After a check that was backed off or
+    failed, get_retry_at() says when checking resumes.
+
     Returns:
         (update_available, latest_version) tuple.
     """
-    global _update_available, _latest_version, _download_url
+    global _retry_at
+    now = time.time()
+    cache = _load_release_cache()
+    _retry_at = 0
+
+    if now < cache.get("retry_at", 0):
+        logger.info("Skipping update check, backing off until %s",
+                    time.strftime("%H:%M:%S", time.localtime(cache["retry_at"])))
+        _retry_at = cache["retry_at"]
+        return _cached_result(cache)
+
+    min_interval = UPDATE_MANUAL_CHECK_INTERVAL if force else UPDATE_CHECK_INTERVAL
+    if cache.get("release") and now - cache.get("checked_at", 0) < min_interval:
+        logger.debug("Using cached release metadata")
+        return _cached_result(cache)
+
+    headers = {"Accept": "application/vnd.github.v3+json"}
+    if cache.get("release"):
+        if cache.get("etag"):
+            headers["If-None-Match"] = cache["etag"]
+        if cache.get("last_modified"):
+            headers["If-Modified-Since"] = cache["last_modified"]
 
     try:
-        response = requests.get(
-            GITHUB_API_URL,
-            headers={"Accept": "application/vnd.github.v3+json"},
-            timeout=10,
-        )
-        response.raise_for_status()
+        response = requests.get(GITHUB_API_URL, headers=headers, timeout=10)
+
+        if response.status_code == 304 and cache.get("release"):
+            logger.info("Release metadata not modified")
+            cache["checked_at"] = now
+            cache["failures"] = 0
+            cache["retry_at"] = _rate_limit_retry_at(response, now)
+            _save_release_cache(cache)
+            return _cached_result(cache)
+
+        if response.status_code in (403, 429):
+            logger.warning("GitHub rate limit hit (HTTP %s)", response.status_code)
+            _backoff(cache, now, _rate_limit_retry_at(response, now))
+            _retry_at = cache["retry_at"]
+            return _cached_result(cache)
 
+        response.raise_for_status()
         data = response.json()
-        _latest_version = data.get("tag_name", "")
 
-        # Find the Windows ZIP asset
-        assets = data.get("assets", [])
-        for asset in assets:
-            name = asset.get("name", "")
-            if name.endswith(".zip") and "win" in name.lower():
-                _download_url = asset.get("browser_download_url", "")
-                break
+        _save_release_cache({
+            "release": data,
+            "etag": response.headers.get("ETag", ""),
+            "last_modified": response.headers.get("Last-Modified", ""),
+            "checked_at": now,
+            "failures": 0,
+            "retry_at": _rate_limit_retry_at(response, now),
+        })
 
-        if not _download_url and assets:
-            # Fallback: use first ZIP asset
-            for asset in assets:
-                if asset.get("name", "").endswith(".zip"):
-                    _download_url = asset.get("browser_download_url", "")
-                    break
+        update_available, latest_version = _apply_release(data)
 
-        _update_available = _is_newer_version(_latest_version, APP_VERSION)
-
-        if _update_available:
-            logger.info("Update available: %s -> %s", APP_VERSION, _latest_version)
+        if update_available:
+            logger.info("Update available: %s -> %s", APP_VERSION, latest_version)
         else:
             logger.info("App is up to date (v%s)", APP_VERSION)
 
-        return _update_available, _latest_version
+        return update_available, latest_version
 
     except requests.RequestException as e:
         logger.warning("Failed to check for updates: %s", e)
-        return False, ""
+        _backoff(cache, now)
+        _retry_at = cache["retry_at"]
+        return _cached_result(cache)
     except Exception:
         logger.exception("Error checking for updates")
         return False, ""
@@ -120,6 +241,21 @@ def show_no_update_notification() -> None:
         logger.exception("Failed to show no-update notification")
 
 
+def show_backoff_notification(retry_at: float) -> None:
+    """Show a toast notification that the update check was put off."""
+    try:
+        toast = Notification(
+            app_id="Waktu Solat",
+            title="Update Check Postponed",
+            msg=("GitHub couldn't be checked just now. Try again after "
+                 f"{time.strftime('%H:%M', time.localtime(retry_at))}."),
+            duration="short",
+        )
+        toast.show()
+    except Exception:
+        logger.exception("Failed to show backoff notification")
+
+
 def _show_progress_notification(message: str) -> None:
     """Show a progress notification."""
     try:
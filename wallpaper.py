@@ -1,19 +1,76 @@
 import ctypes
+import functools
 import logging
 import os
+import threading
+from collections import OrderedDict
 from datetime import datetime
+from typing import BinaryIO
 
 from PIL import Image, ImageDraw, ImageFont
 
+import clock
+from backgrounds import current_phase, get_background, set_cache_sizes
+from hijri import format_hijri
 from config import (
     SCREEN_WIDTH, SCREEN_HEIGHT, WALLPAPER_PATH,
     BG_COLOR, ACCENT_GOLD, WHITE, MUTED_TEXT, HIGHLIGHT_BG,
-    FONT_PATH, FONT_BOLD_PATH, PRAYER_NAMES,
+    FONT_PATH, FONT_BOLD_PATH, PRAYER_NAMES, FRAME_POOL_SIZES,
 )
 
 logger = logging.getLogger(__name__)
 
+# Persistent frame buffers keyed by (width, height): the canvas that is drawn
+# on, the background it is reset from before each render, and that
+# background's phase (None for the flat BG_COLOR fill). Only the
+# _pool_sizes most recently rendered sizes are kept.
+_frames: OrderedDict[tuple[int, int], tuple[Image.Image, Image.Image, str | None]] = OrderedDict()
+_pool_sizes = FRAME_POOL_SIZES
+# Serializes renders, since renders of the same size share one canvas
+_render_lock = threading.Lock()
+
+
+def set_pool_sizes(count: int) -> None:
+    """Keep canvases for the count most recently rendered sizes (at least FRAME_POOL_SIZES).
+
+    Callers that render many sizes in rotation, like the server, size the
+    pool to the sizes they serve so canvases and cached backgrounds aren't
+    evicted and rebuilt every round. The background disk cache grows with it.
+    """
+    global _pool_sizes
+    with _render_lock:
+        _pool_sizes = max(count, FRAME_POOL_SIZES)
+        while len(_frames) > _pool_sizes:
+            _frames.popitem(last=False)
+        set_cache_sizes(_pool_sizes + 1)
+
+
+def _get_canvas(size: tuple[int, int], phase: str | None = None) -> Image.Image:
+    """Return the reusable canvas for size, reset to the phase's background."""
+    entry = _frames.get(size)
+    if entry is not None:
+        _frames.move_to_end(size)
+    if entry is not None and entry[2] == phase:
+        canvas, background, _ = entry
+        canvas.paste(background)
+        return canvas
+
+    if phase is None:
+        background = Image.new("RGB", size, BG_COLOR)
+    else:
+        background = get_background(phase, size, in_use=tuple(_frames))
+    if entry is None:
+        canvas = background.copy()
+    else:
+        canvas = entry[0]
+        canvas.paste(background)
+    _frames[size] = (canvas, background, phase)
+    while len(_frames) > _pool_sizes:
+        _frames.popitem(last=False)
+    return canvas
+
 
+@functools.lru_cache(maxsize=64)
 def _load_font(bold: bool = False, size: int = 20) -> ImageFont.FreeTypeFont | ImageFont.ImageFont:
     path = FONT_BOLD_PATH if bold else FONT_PATH
     if path:
@@ -29,10 +86,50 @@ def generate_wallpaper(
     next_prayer: str | None,
     countdown: str,
     city_display: str = "",
+    size: tuple[int, int] | None = None,
+    path: str | BinaryIO | None = None,
+    hijri_offset: int = 0,
+    at: datetime | None = None,
+    sink=None,
+    save: bool = True,
 ) -> None:
-    """Generate wallpaper image and save to WALLPAPER_PATH."""
-    width, height = SCREEN_WIDTH, SCREEN_HEIGHT
-    img = Image.new("RGB", (width, height), BG_COLOR)
+    """Generate wallpaper image and save it as PNG to path (default WALLPAPER_PATH).
+
+    path may also be a binary file object such as io.BytesIO, for callers
+    that want the encoded image in memory. at is the moment the frame shows
+    (date header and background phase) and defaults to now, so frames can
+    be rendered ahead of time. If sink (a shm_sink.SharedFrameSink) is given
+    the raw RGB frame is published to it; save=False skips the PNG.
+
+    Renders into a per-resolution canvas that is kept between calls and
+    reset from a cached background, instead of allocating a new full-screen
+    image every refresh. The background is the sky theme of the current
+    prayer phase (see backgrounds.py).
+    """
+    with _render_lock:
+        img = _render(prayer_times, next_prayer, countdown, city_display,
+                      size or (SCREEN_WIDTH, SCREEN_HEIGHT), hijri_offset, at or clock.now())
+        if sink is not None:
+            sink.publish(img)
+        if save:
+            path = path or WALLPAPER_PATH
+            img.save(path, "PNG")
+            logger.debug("Wallpaper saved to %s", path)
+
+
+def _render(
+    prayer_times: dict | None,
+    next_prayer: str | None,
+    countdown: str,
+    city_display: str,
+    size: tuple[int, int],
+    hijri_offset: int,
+    now: datetime,
+) -> Image.Image:
+    """Draw the frame onto the pooled canvas for size and return the canvas."""
+    width, height = size
+    phase = current_phase(prayer_times, now) if prayer_times else None
+    img = _get_canvas(size, phase)
     draw = ImageDraw.Draw(img)
 
     # Fonts (scaled relative to height for multi-resolution support)
@@ -43,9 +140,8 @@ def generate_wallpaper(
     font_prayer_bold = _load_font(True, int(32 * scale))
     font_countdown = _load_font(False, int(24 * scale))
 
-    # --- Top-left: Current date ---
-    now = datetime.now()
-    date_str = now.strftime("%A, %d %B %Y")
+    # --- Top-left: Current date (Gregorian and Hijri) ---
+    date_str = f"{now.strftime('%A, %d %B %Y')}  |  {format_hijri(now.date(), hijri_offset)}"
     draw.text((int(40 * scale), int(30 * scale)), date_str, fill=MUTED_TEXT, font=font_date)
 
     # --- Center: Title ---
@@ -122,8 +218,7 @@ def generate_wallpaper(
             countdown_text, fill=ACCENT_GOLD, font=font_countdown,
         )
 
-    img.save(WALLPAPER_PATH, "PNG")
-    logger.debug("Wallpaper saved to %s", WALLPAPER_PATH)
+    return img
 
 
 def set_wallpaper(path: str | None = None) -> None: